@@ -0,0 +1,97 @@
+"""Background health checking of the Postgresql connection pools."""
+import asyncio
+import logging
+
+from prettyconf import config
+from sqlalchemy import event, text
+from sqlalchemy.exc import DBAPIError
+
+from db.postgres import async_engines, untracked_checkout
+from utils.metrics import metrics
+
+HEALTH_CHECK_INTERVAL = config("POSTGRES_HEALTH_CHECK_INTERVAL", default=30,
+                               cast=int)
+
+
+class ConnectionHealthChecker:
+    """Validate idle pool connections on a timer instead of on checkout.
+
+    Every ``interval`` seconds each idle connection of each pool is pinged.
+    Aged connections are recycled by the pool itself (``pool_recycle``).
+    When a disconnect is detected, by the checker or by a request, the engine
+    invalidates the whole pool, so connections opened before a failover are
+    never handed out again; the checker also closes the idle ones right away.
+    The pings are not counted in the pool checkout metrics.
+    """
+
+    def __init__(self, engines: dict, interval: int = HEALTH_CHECK_INTERVAL):
+        """Class initialization."""
+        self.engines = engines
+        self.interval = interval
+        self._task = None
+
+        for workload, engine in engines.items():
+            self._watch_disconnects(workload, engine)
+
+    @staticmethod
+    def _watch_disconnects(workload, engine) -> None:
+
+        @event.listens_for(engine.sync_engine, "handle_error")
+        def handle_error(context):
+            if context.is_disconnect:
+                metrics.increment("db_disconnect_total", pool=workload)
+                logging.warning(f"Disconnect detected on pool {workload}, "
+                                f"invalidating pool connections")
+
+    def start(self) -> None:
+        """Start the background health check task."""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background health check task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            for workload, engine in self.engines.items():
+                try:
+                    await self.check(workload, engine)
+                except Exception as err:
+                    logging.error(f"Error checking pool {workload}: "
+                                  f"{type(err)} {err}")
+
+    @staticmethod
+    async def check(workload, engine) -> None:
+        """Ping every idle connection of the pool once."""
+        token = untracked_checkout.set(True)
+        try:
+            # The pool queue is FIFO, so each checkout returns the connection
+            # that has been idle the longest and the loop visits all of them.
+            for _ in range(engine.sync_engine.pool.checkedin()):
+                try:
+                    async with engine.connect() as connection:
+                        await connection.execute(text("SELECT 1"))
+                except DBAPIError as err:
+                    if not err.connection_invalidated:
+                        raise
+                    metrics.increment("db_health_check_failures_total",
+                                      pool=workload)
+                    # Close the remaining idle connections right away instead
+                    # of waiting for them to be recycled on checkout.
+                    await engine.dispose()
+                    return
+
+                metrics.increment("db_health_checks_total", pool=workload)
+        finally:
+            untracked_checkout.reset(token)
+
+
+health_checker = ConnectionHealthChecker(async_engines)
@@ -1,16 +1,112 @@
 """Postgresql database implementation."""
+import time
+from contextvars import ContextVar
 
 from prettyconf import config
 from sqlalchemy import MetaData
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from utils.metrics import metrics
 
 url = "postgresql+asyncpg://postgres:postgres@db:5432/report_siem"
 postgres_url = config("POSTGRES_URL", default=url)
 postgres_schema = config("POSTGRES_SCHEMA")
+# Connections older than this (seconds) are replaced on checkout.
+pool_recycle = config("POSTGRES_POOL_RECYCLE", default=1800, cast=int)
+# Prepared statements kept per connection by the asyncpg dialect; must fit
+# every query of db.query_catalog.report_queries.
+statement_cache_size = config("POSTGRES_STATEMENT_CACHE_SIZE", default=100,
+                              cast=int)
+
+# Named pools, one per workload, so slow report queries can not starve the
+# fast API calls (list, register) of connections.
+POOL_SETTINGS = {
+    "api": {
+        "pool_size": config("POSTGRES_API_POOL_SIZE", default=10, cast=int),
+        "max_overflow": config("POSTGRES_API_MAX_OVERFLOW", default=10,
+                               cast=int),
+        "pool_timeout": config("POSTGRES_API_POOL_TIMEOUT", default=10,
+                               cast=int),
+    },
+    "reporting": {
+        "pool_size": config("POSTGRES_REPORTING_POOL_SIZE", default=5,
+                            cast=int),
+        "max_overflow": config("POSTGRES_REPORTING_MAX_OVERFLOW", default=5,
+                               cast=int),
+        "pool_timeout": config("POSTGRES_REPORTING_POOL_TIMEOUT", default=60,
+                               cast=int),
+    },
+}
+
+# Set while checking out connections for maintenance (health checks), which
+# are left out of the pool metrics.
+untracked_checkout = ContextVar("untracked_checkout", default=False)
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records checkout wait time and overflow events."""
+
+    workload = "default"
+
+    def _do_get(self):
+        if untracked_checkout.get():
+            return super()._do_get()
+
+        overflow = self._overflow
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            metrics.increment("db_pool_timeout_total", pool=self.workload)
+            raise
+        finally:
+            metrics.observe("db_pool_checkout_wait_seconds",
+                            time.perf_counter() - started,
+                            pool=self.workload)
+
+        if self._overflow > max(overflow, 0):
+            metrics.increment("db_pool_overflow_total", pool=self.workload)
+
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.workload = self.workload
+        return pool
 
-async_engine = create_async_engine(postgres_url, future=True, pool_pre_ping=True)  # NOQA
+
+def create_workload_engine(workload: str):
+    """Create the async engine of a named pool and register its metrics."""
+    engine = create_async_engine(
+        make_url(postgres_url).update_query_dict(
+            {"prepared_statement_cache_size": str(statement_cache_size)}),
+        future=True,
+        pool_recycle=pool_recycle,
+        poolclass=InstrumentedPool,
+        **POOL_SETTINGS[workload]
+    )
+    engine.sync_engine.pool.workload = workload
+
+    metrics.register_gauge("db_pool_in_use",
+                           lambda: engine.sync_engine.pool.checkedout(),
+                           pool=workload)
+    metrics.register_gauge("db_pool_overflow",
+                           lambda: max(engine.sync_engine.pool.overflow(), 0),
+                           pool=workload)
+
+    return engine
+
+
+async_engines = {
+    workload: create_workload_engine(workload) for workload in POOL_SETTINGS
+}
+
+async_engine = async_engines["api"]
 
 SessionLocal = sessionmaker(
     async_engine,
@@ -18,4 +114,10 @@ SessionLocal = sessionmaker(
     expire_on_commit=False,
 )
 
+ReportingSessionLocal = sessionmaker(
+    async_engines["reporting"],
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 Base = declarative_base(metadata=MetaData(schema=postgres_schema))
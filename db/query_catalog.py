@@ -0,0 +1,104 @@
+"""Catalog of the named report queries."""
+import json
+import random
+import time
+from typing import Dict, Union
+
+from prettyconf import config
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import text
+from sqlalchemy.sql.elements import TextClause
+
+from utils.metrics import metrics
+
+# Share of the runs whose planning time is measured with an extra EXPLAIN
+QUERY_PLAN_SAMPLE_RATE = config("QUERY_PLAN_SAMPLE_RATE", default=0.01,
+                                cast=float)
+
+
+class QueryCatalog:
+    """Registry of the report SQL, executed by name.
+
+    Each query is registered once, so the exact same statement text reaches
+    the asyncpg dialect on every run and can be found in its per-connection
+    statement cache. Every run is timed under the query name, and a sample
+    of the runs is planned first with ``EXPLAIN (SUMMARY)`` to measure the
+    planning time of the same statement and parameters.
+    """
+
+    def __init__(self, plan_sample_rate: float = QUERY_PLAN_SAMPLE_RATE) -> None:
+        """Class initialization."""
+        self.plan_sample_rate = plan_sample_rate
+        self._queries: Dict[str, TextClause] = {}
+        self._explains: Dict[str, TextClause] = {}
+
+    def register(self, name: str, sql: str) -> TextClause:
+        """Register a query under a unique name."""
+        if name in self._queries:
+            raise ValueError(f"Query {name} is already registered")
+
+        self._queries[name] = text(sql)
+        self._explains[name] = text(f"EXPLAIN (SUMMARY, FORMAT JSON) {sql}")
+        return self._queries[name]
+
+    def get(self, name: str) -> TextClause:
+        """Get a registered query."""
+        return self._queries[name]
+
+    @property
+    def names(self):
+        """Names of every registered query."""
+        return list(self._queries)
+
+    async def execute(self, db: AsyncSession, name: str,
+                      params: Union[dict, None] = None):
+        """Execute a registered query by name."""
+        await self._sample_planning(db, name, params)
+
+        started = time.perf_counter()
+        try:
+            return await db.execute(self._queries[name], params)
+        finally:
+            metrics.observe("query_execute_seconds",
+                            time.perf_counter() - started, query=name)
+
+    async def stream(self, db: AsyncSession, name: str,
+                     params: Union[dict, None] = None,
+                     chunk_size: int = 1000):
+        """Execute a registered query by name, yielding its rows.
+
+        Rows are fetched from a server side cursor ``chunk_size`` at a time,
+        so a large result is never held in memory by the driver.
+        """
+        await self._sample_planning(db, name, params)
+
+        # Timed however the iteration ends: exhausted, failed or closed early
+        started = time.perf_counter()
+        try:
+            result = await db.stream(self._queries[name], params)
+            async for rows in result.partitions(chunk_size):
+                for row in rows:
+                    yield row
+        finally:
+            metrics.observe("query_execute_seconds",
+                            time.perf_counter() - started, query=name)
+
+    async def _sample_planning(self, db: AsyncSession, name: str,
+                               params: Union[dict, None]) -> None:
+        """Observe the planning time of a sample of the runs of a query.
+
+        The EXPLAIN runs the query statement with the same parameters, so it
+        can only fail where the query itself would.
+        """
+        if random.random() >= self.plan_sample_rate:
+            return
+
+        result = await db.execute(self._explains[name], params)
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        metrics.observe("query_planning_seconds",
+                        plan[0]["Planning Time"] / 1000, query=name)
+
+
+report_queries = QueryCatalog()
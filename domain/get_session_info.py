@@ -1,12 +1,133 @@
 """Get tenant session info."""
+import hashlib
 import logging
+import time
+from typing import Union
+
+import jwt
 from aiohttp import ClientSession, client_exceptions
+from prettyconf import config
+
 import settings
+from utils.async_cache import AsyncTTLCache
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
 from utils.common import http_exception
+from utils.metrics import metrics
+
+# "remote" asks user_interface for every tenant; "claims" first looks for the
+# tenant memberships ({code: id}) in the access token, or in a signed tenant
+# claims token, and only asks user_interface when they are missing or stale.
+TENANT_AUTHORIZATION_MODE = config("TENANT_AUTHORIZATION_MODE",
+                                   default="remote")
+TENANT_CLAIM = config("TENANT_CLAIM", default="tenants")
+# Claims issued longer ago than this (seconds) are stale
+TENANT_CLAIMS_MAX_AGE = config("TENANT_CLAIMS_MAX_AGE", default=900, cast=int)
+# Key of the tenant claims token; no key disables it
+TENANT_CLAIMS_SECRET = config("TENANT_CLAIMS_SECRET", default="")
+TENANT_CLAIMS_ALGORITHM = config("TENANT_CLAIMS_ALGORITHM", default="HS256")
+TENANT_CLAIMS_HEADER = "X-Tenant-Claims"
+
+# Shared by every call to user_interface: once it degrades, calls fail fast
+# (or are answered from the caches) instead of waiting on it.
+user_interface_breaker = CircuitBreaker(
+    "user_interface",
+    failure_rate=config("USER_INTERFACE_BREAKER_FAILURE_RATE", default=0.5,
+                        cast=float),
+    slow_call_seconds=config("USER_INTERFACE_BREAKER_SLOW_CALL", default=2,
+                             cast=float),
+    reset_timeout=config("USER_INTERFACE_BREAKER_RESET_TIMEOUT", default=30,
+                         cast=float)
+)
+# Send a second GET when the first is slower than the recent p95 latency
+USER_INTERFACE_HEDGE = config("USER_INTERFACE_HEDGE", default=False,
+                              cast=config.boolean)
+
+# Tenant info almost never changes: it is cached per tenant and token, and an
+# expired entry is still served for a while as it is fetched again.
+tenant_session_cache = AsyncTTLCache(
+    "tenant_session_info",
+    ttl=config("TENANT_INFO_CACHE_TTL", default=60, cast=float),
+    max_size=config("TENANT_INFO_CACHE_SIZE", default=2048, cast=int),
+    stale_ttl=config("TENANT_INFO_CACHE_STALE_TTL", default=300, cast=float),
+    stale_on_errors=(CircuitOpenError,)
+)
+
+
+def get_tenant_from_claims(tenant_code: str, claims: Union[dict, None],
+                           tenant_claims_token: Union[str, None] = None
+                           ) -> Union[dict, None]:
+    """Tenant information from verified claims, None when they can not tell.
+
+    ``claims`` are the claims of the already verified access token. When they
+    carry no memberships, the tenant claims token is verified with its own
+    key and must belong to the same subject.
+    """
+    claims = claims or {}
+    memberships = claims.get(TENANT_CLAIM)
+
+    if memberships is None and tenant_claims_token and TENANT_CLAIMS_SECRET:
+        try:
+            tenant_claims = jwt.decode(tenant_claims_token, TENANT_CLAIMS_SECRET,
+                                       algorithms=[TENANT_CLAIMS_ALGORITHM])
+        except jwt.InvalidTokenError as e:
+            logging.info(f"Invalid tenant claims token - {type(e)} {e}")
+            return None
+
+        if tenant_claims.get("sub") != claims.get("sub"):
+            return None
+        claims = tenant_claims
+        memberships = claims.get(TENANT_CLAIM)
+
+    issued_at = claims.get("iat")
+    if not isinstance(memberships, dict) or \
+            not isinstance(issued_at, (int, float)) or \
+            time.time() - issued_at > TENANT_CLAIMS_MAX_AGE:
+        return None
+
+    # Anything but an integer id is a malformed claim, left to user_interface
+    tenant_id = memberships.get(tenant_code)
+    if not isinstance(tenant_id, int) or isinstance(tenant_id, bool):
+        return None
+
+    return {"tenant_id": tenant_id, "code": tenant_code}
 
 
 async def get_tenant_session_info(tenant_code, jwt_token,
-                                  client_session: ClientSession):
+                                  client_session: ClientSession,
+                                  claims: Union[dict, None] = None,
+                                  tenant_claims_token: Union[str, None] = None):
+    """Get tenant information from user_interface, through the cache.
+
+    The token is part of the key, so each caller is still authorized by
+    user_interface once per TTL. In the "claims" authorization mode,
+    memberships found in the claims are used without calling user_interface.
+    """
+    if TENANT_AUTHORIZATION_MODE == "claims":
+        tenant = get_tenant_from_claims(tenant_code, claims,
+                                        tenant_claims_token)
+        metrics.increment("tenant_authorization_total",
+                          source="remote" if tenant is None else "claims")
+        if tenant is not None:
+            return tenant
+
+    token = hashlib.sha256(jwt_token.encode("utf-8")).hexdigest()
+
+    try:
+        return await tenant_session_cache.get(
+            (tenant_code, token),
+            lambda: user_interface_breaker.call(
+                lambda: fetch_tenant_session_info(tenant_code, jwt_token,
+                                                  client_session),
+                hedge=USER_INTERFACE_HEDGE))
+
+    except CircuitOpenError as e:
+        logging.error(f"Error getting info for tenant #{str(tenant_code)}"
+                      f" - {e}")
+        raise http_exception(message=str(e), status=503)
+
+
+async def fetch_tenant_session_info(tenant_code, jwt_token,
+                                    client_session: ClientSession):
     """Get tenant information from user_interface"""
 
     user_interface_tenant_session_info_url = \
@@ -2,9 +2,34 @@
 import logging
 
 from aiohttp import ClientSession, client_exceptions
+from prettyconf import config
 
 import settings
+from domain.get_session_info import user_interface_breaker, \
+    USER_INTERFACE_HEDGE
+from domain.kafka_consumer import EventListener
+from utils.async_cache import AsyncTTLCache
+from utils.circuit_breaker import CircuitOpenError
 from utils.common import http_exception
+from utils.exceptions import NotFoundException
+
+# Profiles by (tenant_code, email); unknown emails are cached for a shorter
+# time. Entries are dropped by the profile change events of user_interface.
+user_profile_cache = AsyncTTLCache(
+    "user_profile",
+    ttl=config("USER_PROFILE_CACHE_TTL", default=300, cast=float),
+    max_size=config("USER_PROFILE_CACHE_SIZE", default=2048, cast=int),
+    negative_ttl=config("USER_PROFILE_NEGATIVE_CACHE_TTL", default=30,
+                        cast=float),
+    negative_errors=(NotFoundException,),
+    stale_on_errors=(CircuitOpenError,)
+)
+# Topics of the profile change events of user_interface; the consumer warns
+# at startup about the ones that do not exist.
+USER_PROFILE_EVENTS_TOPICS = config(
+    "USER_PROFILE_EVENTS_TOPICS",
+    default="user.user_profile.updated,user.user_profile.deleted",
+    cast=config.list)
 
 
 async def get_user_profiles_info(tenant_code, jwt_token,
@@ -38,6 +63,25 @@ async def get_user_profiles_by_email(tenant_code: str,
                                      jwt_token: str,
                                      email: str,
                                      client_session: ClientSession):
+    """Get user profile from user_interface by email, through the cache."""
+    try:
+        return await user_profile_cache.get(
+            (tenant_code, email),
+            lambda: user_interface_breaker.call(
+                lambda: fetch_user_profiles_by_email(tenant_code, jwt_token,
+                                                     email, client_session),
+                hedge=USER_INTERFACE_HEDGE))
+
+    except CircuitOpenError as e:
+        logging.error(f"Error getting user profile info for tenant "
+                      f"#{str(tenant_code)} - {e}")
+        raise http_exception(message=str(e), status=503)
+
+
+async def fetch_user_profiles_by_email(tenant_code: str,
+                                       jwt_token: str,
+                                       email: str,
+                                       client_session: ClientSession):
     """Get user profile from user_interface by email"""
 
     user_interface_user_profile_url = \
@@ -60,4 +104,30 @@ async def get_user_profiles_by_email(tenant_code: str,
     except client_exceptions.ClientResponseError as e:
         logging.exception(f"Error getting user profile info for tenant "
                           f"#{str(tenant_code)} - {type(e)} {e.message}")
+        if e.status == 404:
+            raise NotFoundException(message=e.message)
         raise http_exception(message=e.message, status=e.status)
+
+
+def invalidate_user_profile(message: dict) -> None:
+    """Drop the cached profile of a user profile change event.
+
+    Events without an email drop every cached profile.
+    """
+    if not isinstance(message, dict):
+        logging.warning(f"Ignoring user profile event of type "
+                        f"{type(message).__name__}")
+        return
+
+    payload = message.get("payload")
+    email = payload.get("email") if isinstance(payload, dict) else None
+
+    if email is None:
+        user_profile_cache.clear()
+    else:
+        user_profile_cache.invalidate_if(lambda key: key[1] == email)
+
+
+user_profile_events = EventListener("user_profile_events",
+                                    USER_PROFILE_EVENTS_TOPICS,
+                                    invalidate_user_profile)
@@ -0,0 +1,113 @@
+"""Kafka consumer implementations."""
+import asyncio
+import json
+import logging
+import threading
+from typing import Callable, List, Union
+
+from kafka import KafkaConsumer
+from prettyconf import config
+
+from domain.kafka_producer import get_kafka_config
+from utils.metrics import metrics
+
+# Seconds before a failed consumer is started again, doubled on each failure
+KAFKA_CONSUMER_RETRY_DELAY = config("KAFKA_CONSUMER_RETRY_DELAY", default=1,
+                                    cast=float)
+KAFKA_CONSUMER_RETRY_MAX_DELAY = config("KAFKA_CONSUMER_RETRY_MAX_DELAY",
+                                        default=60, cast=float)
+
+
+class EventListener:
+    """Background consumer calling a handler for each message of some topics.
+
+    Messages are read on a thread by kafka-python and handed to the handler
+    on the event loop. Without a consumer group, every instance of the
+    application receives every message, as cache invalidation requires.
+    A consumer that fails is started again with an exponential backoff
+    until the listener is stopped.
+    """
+
+    def __init__(self, name: str, topics: List[str],
+                 handler: Callable[[dict], None]) -> None:
+        """Class initialization."""
+        self.name = name
+        self.topics = topics
+        self.handler = handler
+        self._thread: Union[threading.Thread, None] = None
+        self._stopped = threading.Event()
+        self._polled = False
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+
+        loop = asyncio.get_running_loop()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, args=(loop,),
+                                        name=self.name, daemon=True)
+        self._thread.start()
+
+    async def stop(self) -> None:
+        if self._thread is None:
+            return
+
+        self._stopped.set()
+        await asyncio.get_running_loop().run_in_executor(
+            None, self._thread.join, 5)
+        self._thread = None
+
+    def _run(self, loop: asyncio.AbstractEventLoop) -> None:
+        delay = KAFKA_CONSUMER_RETRY_DELAY
+        while not self._stopped.is_set():
+            self._polled = False
+            try:
+                self._consume(loop)
+                return
+            except Exception as e:
+                metrics.increment("kafka_consumer_errors_total",
+                                  consumer=self.name)
+                logging.exception(f"Error consuming {self.name}, retrying "
+                                  f"in {delay}s - {type(e)} {e}")
+
+            # A consumer that worked for a while starts over from the
+            # shortest delay.
+            if self._polled:
+                delay = KAFKA_CONSUMER_RETRY_DELAY
+            self._stopped.wait(delay)
+            delay = min(delay * 2, KAFKA_CONSUMER_RETRY_MAX_DELAY)
+
+    def _consume(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Dispatch the messages until the listener is stopped."""
+        consumer = KafkaConsumer(*self.topics, auto_offset_reset="latest",
+                                 **get_kafka_config())
+        try:
+            # Subscribing to a missing topic is not an error, the consumer
+            # would just never receive anything.
+            missing = set(self.topics) - consumer.topics()
+            if missing:
+                logging.warning(f"Consumer {self.name} subscribed to missing "
+                                f"topics: {', '.join(sorted(missing))}")
+
+            while not self._stopped.is_set():
+                batches = consumer.poll(timeout_ms=1000)
+                self._polled = True
+                for records in batches.values():
+                    for record in records:
+                        self._dispatch(loop, record.value)
+        finally:
+            consumer.close()
+
+    def _dispatch(self, loop: asyncio.AbstractEventLoop,
+                  value: Union[bytes, None]) -> None:
+        # Tombstones (null values) carry no message
+        if value is None:
+            return
+
+        try:
+            message = json.loads(value)
+        except (TypeError, ValueError) as e:
+            logging.error(f"Invalid message on {self.name} - {e}")
+            return
+
+        loop.call_soon_threadsafe(self.handler, message)
@@ -1,54 +1,131 @@
 """Kafka producer implementations."""
 import json
 import logging
+import threading
+import time
 import uuid
 from datetime import datetime
 import ssl
 
 from kafka import KafkaProducer
 from kafka.errors import KafkaError
+from kafka.producer.future import FutureRecordMetadata
+from prettyconf import config
 
 from settings import KAFKA_BOOTSTRAP_SERVERS, USE_KAFKA_SASL_AUTH, \
     KAFKA_USERNAME, KAFKA_PASSWORD
+from utils.metrics import metrics
 
+# Batching of the shared producer: messages wait up to linger_ms for a batch
+# of batch_size bytes per partition, compressed with compression_type.
+KAFKA_PRODUCER_SETTINGS = {
+    "linger_ms": config("KAFKA_LINGER_MS", default=20, cast=int),
+    "batch_size": config("KAFKA_BATCH_SIZE", default=32768, cast=int),
+    "compression_type": config("KAFKA_COMPRESSION_TYPE", default="gzip"),
+    "acks": config("KAFKA_ACKS", default="1",
+                   cast=lambda acks: acks if acks == "all" else int(acks)),
+    # Longest time send() can block, waiting for metadata or buffer space
+    "max_block_ms": config("KAFKA_MAX_BLOCK_MS", default=5000, cast=int),
+}
+KAFKA_CLOSE_TIMEOUT = config("KAFKA_CLOSE_TIMEOUT", default=10, cast=int)
 
-def publish_message(
-        name,
-        topic,
-        payload=None,
-        type_message_key=None,
-        metadata=None,
-):
-    """Post a new post in the Kafka topic."""
-    try:
-        logging.info(f"Publishing message {name} in {topic}")
-        protocol = {
-            "name": name,
-            "version": 1.0,
-            "flow_id": str(uuid.uuid5(
-                uuid.NAMESPACE_X500, datetime.now().isoformat())),
-            "payload": payload,
-            "metadata": metadata,
-        }
-        if type_message_key:
-            protocol['metadata'] = {"type_message_key": type_message_key}
-
-        kafka_config = {
-            "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS,
-            "security_protocol": "SASL_SSL",
-            "ssl_context": ssl.create_default_context(),
-            "sasl_mechanism": "PLAIN",
-            "sasl_plain_username": KAFKA_USERNAME,
-            "sasl_plain_password": KAFKA_PASSWORD
-        } if USE_KAFKA_SASL_AUTH else {
-            "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS
-        }
-
-        producer_instance = KafkaProducer(**kafka_config)
-
-        producer_instance.send(topic, bytes(json.dumps(protocol), "utf-8"))
-        producer_instance.flush()
-        producer_instance.close()
-
-    except KafkaError as e:
-        logging.exception(f"Error publishing message {name} - {type(e)} {e}")
+
+def _build_protocol(name, payload=None, type_message_key=None, metadata=None,
+                    flow_id=None):
+    protocol = {
+        "name": name,
+        "version": 1.0,
+        "flow_id": flow_id or str(uuid.uuid5(
+            uuid.NAMESPACE_X500, datetime.now().isoformat())),
+        "payload": payload,
+        "metadata": metadata,
+    }
+    if type_message_key:
+        protocol['metadata'] = {"type_message_key": type_message_key}
+
+    return protocol
+
+
+def get_kafka_config():
+    """Connection settings shared by the Kafka producers and consumers."""
+    return {
+        "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS,
+        "security_protocol": "SASL_SSL",
+        "ssl_context": ssl.create_default_context(),
+        "sasl_mechanism": "PLAIN",
+        "sasl_plain_username": KAFKA_USERNAME,
+        "sasl_plain_password": KAFKA_PASSWORD
+    } if USE_KAFKA_SASL_AUTH else {
+        "bootstrap_servers": KAFKA_BOOTSTRAP_SERVERS
+    }
+
+
+class EventProducer:
+    """Long-lived Kafka producer shared by the application.
+
+    It is started and stopped with the application, and its I/O thread
+    delivers the messages in batches. get() may connect to the brokers and
+    send() may wait for topic metadata or buffer space (up to max_block_ms),
+    so both are blocking calls, made off the event loop: the outbox relay
+    sends from an executor thread.
+    """
+
+    producer: KafkaProducer = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def get(cls) -> KafkaProducer:
+        """The shared producer, created on first use if not started."""
+        with cls._lock:
+            if cls.producer is None:
+                cls.producer = KafkaProducer(**get_kafka_config(),
+                                             **KAFKA_PRODUCER_SETTINGS)
+            return cls.producer
+
+    @classmethod
+    def start(cls) -> None:
+        try:
+            cls.get()
+        except KafkaError as e:
+            logging.exception(f"Error starting Kafka producer - {type(e)} {e}")
+
+    @classmethod
+    def stop(cls) -> None:
+        """Deliver the pending messages and close the producer."""
+        with cls._lock:
+            producer, cls.producer = cls.producer, None
+
+        if producer is not None:
+            producer.flush(timeout=KAFKA_CLOSE_TIMEOUT)
+            producer.close(timeout=KAFKA_CLOSE_TIMEOUT)
+
+
+def _send(name, topic, protocol) -> FutureRecordMetadata:
+    """Enqueue a message, recording its delivery once acknowledged."""
+    enqueued_at = time.monotonic()
+
+    def on_delivery(_):
+        metrics.increment("kafka_messages_delivered_total", topic=topic)
+        metrics.observe("kafka_delivery_seconds",
+                        time.monotonic() - enqueued_at, topic=topic)
+
+    def on_error(error):
+        metrics.increment("kafka_messages_failed_total", topic=topic)
+        logging.error(f"Error delivering message {name} in {topic} - "
+                      f"{type(error)} {error}")
+
+    future = EventProducer.get().send(topic, bytes(json.dumps(protocol), "utf-8"))
+    future.add_callback(on_delivery).add_errback(on_error)
+    return future
+
+
+def send_message(name, topic, flow_id, payload=None, type_message_key=None,
+                 metadata=None) -> FutureRecordMetadata:
+    """Enqueue a message, returning the future of its delivery.
+
+    Blocking (see EventProducer), never call it on the event loop.
+    ``flow_id`` identifies the event, so consumers can drop the duplicates
+    of a redelivery.
+    """
+    return _send(name, topic, _build_protocol(name, payload, type_message_key,
+                                              metadata, flow_id))
@@ -0,0 +1,144 @@
+"""Relay of the outbox events to Kafka."""
+import asyncio
+import logging
+import time
+from typing import List, Tuple
+
+from kafka.errors import KafkaError
+from prettyconf import config
+
+from db.postgres import SessionLocal
+from domain.kafka_producer import send_message
+from models.outbox import OutboxDTO, OutboxEvent
+from utils.metrics import metrics
+
+OUTBOX_BATCH_SIZE = config("OUTBOX_BATCH_SIZE", default=500, cast=int)
+# Seconds between polls of an empty outbox; events written by this instance
+# wake the relay up right away.
+OUTBOX_POLL_INTERVAL = config("OUTBOX_POLL_INTERVAL", default=1, cast=float)
+# Seconds to wait for Kafka to acknowledge a whole batch
+OUTBOX_DELIVERY_TIMEOUT = config("OUTBOX_DELIVERY_TIMEOUT", default=10,
+                                 cast=float)
+# Failed attempts after which an event is parked instead of relayed again
+OUTBOX_MAX_ATTEMPTS = config("OUTBOX_MAX_ATTEMPTS", default=10, cast=int)
+
+
+def _deliver(events: List[OutboxEvent]
+             ) -> Tuple[List[int], List[Tuple[OutboxEvent, str]]]:
+    """Publish events and wait for them under one deadline.
+
+    Returns the delivered ids and the (event, error) of the others; events
+    not acknowledged in time are not delivered.
+    """
+    deadline = time.monotonic() + OUTBOX_DELIVERY_TIMEOUT
+
+    futures = []
+    failures = []
+    for event in events:
+        # send() blocks while it waits for the topic metadata
+        if time.monotonic() >= deadline:
+            failures.append((event, "Not sent before the delivery deadline"))
+            continue
+        try:
+            futures.append((event, send_message(
+                event.name, event.topic, str(event.flow_id), event.payload)))
+        except KafkaError as error:
+            failures.append((event, f"{type(error).__name__}: {error}"))
+
+    delivered = []
+    for event, future in futures:
+        try:
+            future.get(timeout=max(deadline - time.monotonic(), 0))
+            delivered.append(event.id)
+        except KafkaError as error:
+            failures.append((event, f"{type(error).__name__}: {error}"))
+
+    return delivered, failures
+
+
+class OutboxRelay:
+    """Background task draining the outbox to Kafka in batches.
+
+    A batch is locked, published and deleted in one transaction, so an event
+    is deleted only once Kafka acknowledged it: delivery is at-least-once,
+    and an event may be published again (with the same flow_id) when the
+    relay stops between the acknowledgement and the commit. Events failing
+    OUTBOX_MAX_ATTEMPTS times are parked with their last error.
+    """
+
+    def __init__(self, batch_size: int = OUTBOX_BATCH_SIZE,
+                 interval: float = OUTBOX_POLL_INTERVAL) -> None:
+        """Class initialization."""
+        self.batch_size = batch_size
+        self.interval = interval
+        self._task = None
+        self._wakeup = asyncio.Event()
+
+    def notify(self) -> None:
+        """Drain the outbox now instead of on the next poll."""
+        self._wakeup.set()
+
+    def start(self) -> None:
+        """Start the background relay task."""
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the background relay task."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            try:
+                # Keep draining while the batches come back full
+                while await self.relay_batch() == self.batch_size:
+                    pass
+            except Exception as err:
+                metrics.increment("outbox_relay_errors_total")
+                logging.error(f"Error relaying outbox events: "
+                              f"{type(err)} {err}")
+
+    async def relay_batch(self) -> int:
+        """Publish one batch of events, returning how many were locked."""
+        async with SessionLocal() as session:
+            outbox_dto = OutboxDTO(session)
+            events = await outbox_dto.lock_batch(self.batch_size)
+            if not events:
+                return 0
+
+            # Waiting for the acknowledgements blocks
+            delivered, failures = await asyncio.get_running_loop() \
+                .run_in_executor(None, _deliver, events)
+
+            await outbox_dto.delete(delivered)
+            parked = await outbox_dto.record_failures(failures,
+                                                      OUTBOX_MAX_ATTEMPTS)
+            await session.commit()
+
+        metrics.increment("outbox_events_relayed_total", len(delivered))
+        for event in parked:
+            metrics.increment("outbox_events_parked_total", topic=event.topic)
+            logging.error(f"Parked outbox event #{event.id} {event.name} in "
+                          f"{event.topic} after {OUTBOX_MAX_ATTEMPTS} attempts")
+
+        if failures:
+            # Kafka is failing; retry on the next poll instead of spinning
+            metrics.increment("outbox_events_failed_total", len(failures))
+            return 0
+        return len(events)
+
+
+outbox_relay = OutboxRelay()
@@ -1,13 +1,21 @@
 """Report Service."""
+import hashlib
 from datetime import datetime
+from typing import List, Union
+
 import oci
 from oci.object_storage import UploadManager
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.oci import oci_config
+from domain.outbox_relay import outbox_relay
 from domain.utils.format_date import formate_date
-from models.report import ReportDTO, Report
+from models.report import EventsBuilder, ReportDTO, Report
 from settings.__init__ import ENVIRONMENT
+from utils.cache import MicroCache
+
+# Encoded list responses by (tenant, ETag)
+report_list_responses = MicroCache()
 
 
 async def save_report(report_name, report_id):
@@ -34,8 +42,14 @@ class ReportService:
 
         self.report_dto = ReportDTO(session, tenant_id)
 
-    async def create_report(self, report_data: dict) -> Report:
-        """Create report."""
+    async def create_report(self, report_data: dict,
+                            events: Union[EventsBuilder, None] = None
+                            ) -> Report:
+        """Create report.
+
+        The outbox messages of ``events(report_data, report)`` are written in
+        the same transaction.
+        """
         report_data["start_date"] = report_data["start_date"].replace(
             tzinfo=None)
         report_data["end_date"] = report_data["end_date"].replace(tzinfo=None)
@@ -44,22 +58,58 @@ class ReportService:
 
         new_report = Report(**report_data)
 
-        await self.report_dto.create(new_report)
+        report_events = None
+        if events is not None:
+            async def report_events(report):
+                return await events(report_data, report)
+
+        await self.report_dto.create(new_report, report_events)
+        outbox_relay.notify()
 
         return new_report
 
+    async def create_reports(self, reports_data: List[dict],
+                             events: Union[EventsBuilder, None] = None
+                             ) -> list:
+        """Create reports in a single transaction, returning (id, type).
+
+        The outbox messages of ``events(report_data, row)`` are written in
+        the same transaction.
+        """
+        now = datetime.utcnow()
+        for report_data in reports_data:
+            report_data["start_date"] = report_data["start_date"].replace(
+                tzinfo=None)
+            report_data["end_date"] = report_data["end_date"].replace(
+                tzinfo=None)
+            report_data["created_at"] = now
+            report_data["updated_at"] = now
+
+        new_reports = await self.report_dto.create_many(reports_data, events)
+        outbox_relay.notify()
+
+        return new_reports
+
     async def get_all_reports(self, report_parameters) -> dict:
         """Get all the reports according to the given parameters."""
         reports = await self.report_dto.get_all_with_filters(
             **report_parameters)
 
         # Add available values for filters
-        filter_created_by = await self.report_dto.get_unique_created_by_values()
-
-        reports["available_filters"] = {"created_by": filter_created_by}
+        reports["available_filters"] = await self.report_dto.get_facet_values()
 
         return reports
 
+    async def get_list_etag(self, query: str) -> str:
+        """Weak ETag of a report list query.
+
+        Derived from the tenant report version, which the database bumps
+        whenever a report is created or changes status.
+        """
+        version = await self.report_dto.get_version()
+        query = hashlib.sha1(query.encode("utf-8")).hexdigest()[:16]
+        return f'W/"{version}-{query}"'
+
     @staticmethod
     def builds_and_formats_start_and_end_date(
             start_date: datetime,
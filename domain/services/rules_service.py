@@ -3,51 +3,142 @@ from datetime import datetime
 
 from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.sql import text
 
-from utils.common import get_db_postgres
+from db.query_catalog import report_queries
+from utils.cache import cached_query
+from utils.common import get_db_postgres_reporting
+
+# Alerts are bucketed by day in the user timezone: created_at (UTC) is shifted
+# to the local time before date_trunc, and the local range bounds are shifted
+# back to UTC so the filter stays on the raw created_at column. The other
+# queries shift their range bounds the same way.
+report_queries.register(
+    "incident_alerts_table",
+    """select alert.id, rule.name,
+            date_trunc('day', (alert.created_at AT TIME ZONE 'UTC') AT TIME ZONE :tz) as created_date,
+            alert.triggers
+        from rule_interface.alert as alert
+            inner join rule_interface.rule as rule on rule.id=alert.rule_id
+        where alert.tenant_id=:tenant_id and alert.trial = false and alert.created_at between \
+        (CAST(:start_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' and \
+        (CAST(:end_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC'
+        order by created_date, alert.id"""
+)
+
+report_queries.register(
+    "top_10_rules_general",
+    """SELECT rule.id, rule.name, \
+      CASE WHEN rule.rule_type=1 THEN 'Match' WHEN rule.rule_type=2 THEN 'Threshold' \
+      WHEN rule.rule_type=3 THEN 'Correlation' WHEN rule.rule_type=4 THEN 'Advanced' END as type, \
+      sum(alert.triggers) as alerts FROM rule_interface.rule as rule \
+      INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id \
+      WHERE alert.tenant_id =:tenant_id and alert.created_at between \
+      (CAST(:start_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' and \
+      (CAST(:end_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' \
+      GROUP BY rule.id ORDER BY alerts DESC limit 10"""
+)
+
+# Shared by the Match (1), Threshold (2), Correlation (3) and Advanced (4)
+# rankings, which only differ by rule type.
+report_queries.register(
+    "top_10_rules_by_type",
+    """SELECT rule.id, rule.name, sum(alert.triggers) as alerts,
+      CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low'
+      WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High'
+      WHEN rule.severity=5 THEN 'Critical' END as severity,
+      CASE WHEN rule.source=0 THEN 'Default' WHEN rule.source=1 THEN 'Tenant' WHEN rule.source=2 THEN 'Channel' END as source
+      FROM rule_interface.rule as rule
+      INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id
+      WHERE alert.tenant_id =:tenant_id and rule.rule_type = :rule_type and alert.created_at between
+      (CAST(:start_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' and
+      (CAST(:end_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC'
+      GROUP BY rule.id ORDER BY alerts DESC limit 10"""
+)
+
+report_queries.register(
+    "triggered_rules",
+    """select rule.id, rule.name, count(trigg.id) as triggers, sum(trigg.logs) as hits,
+        CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low'
+        WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High'
+        WHEN rule.severity=5 THEN 'Critical' END as severity,
+        concat_ws('-', rule.id, rule.name) as rule_data, rule.source
+        from rule_interface.alert as alert
+            inner join rule_interface.rule as rule on rule.id=alert.rule_id
+            inner join rule_interface.trigger as trigg on trigg.alert_id=alert.id
+        where alert.tenant_id=:tenant_id and trigg.start_date_query between \
+        (CAST(:start_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' and \
+        (CAST(:end_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC'
+        group by rule.id order by triggers desc, rule.id"""
+)
+
+# Triggers summed per chart interval of the user timezone: 'hour' buckets
+# are :step_hours wide and aligned to midnight, 'day', 'month' and 'year'
+# buckets follow date_trunc.
+report_queries.register(
+    "triggered_rules_series",
+    """select
+            case when CAST(:unit AS text) = 'hour' then
+                date_trunc('day', local.start_date)
+                + (CAST(extract(hour from local.start_date) AS integer)
+                   / CAST(:step_hours AS integer))
+                * CAST(:step_hours AS integer) * interval '1 hour'
+            else date_trunc(CAST(:unit AS text), local.start_date)
+            end as interval_start,
+            count(trigg.id) as triggers,
+            concat_ws('-', rule.id, rule.name) as rule_data
+        from rule_interface.alert as alert
+            inner join rule_interface.rule as rule on rule.id=alert.rule_id
+            inner join rule_interface.trigger as trigg on trigg.alert_id=alert.id
+            cross join lateral (select (trigg.start_date_query AT TIME ZONE 'UTC') \
+                AT TIME ZONE :tz as start_date) as local
+        where alert.tenant_id=:tenant_id and trigg.start_date_query between \
+        (CAST(:start_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC' and \
+        (CAST(:end_date AS timestamp) AT TIME ZONE :tz) AT TIME ZONE 'UTC'
+        group by interval_start, rule.id, rule.name"""
+)
+
+# Chart gap (see domain.triggered_rules.get_fixed_intervals) -> SQL bucket
+TRIGGERED_RULES_BUCKETS = {
+    "1H": {"unit": "hour", "step_hours": 1},
+    "6H": {"unit": "hour", "step_hours": 6},
+    "1d": {"unit": "day", "step_hours": 1},
+    "1M": {"unit": "month", "step_hours": 1},
+    "1Y": {"unit": "year", "step_hours": 1},
+}
 
 
 class RuleService:
     """Rule Services."""
 
     @staticmethod
+    @cached_query("incident_alerts")
     async def get_alerts_and_rules(
             start_date: datetime,
             end_date: datetime,
             tenant_id: int,
-            db: AsyncSession = Depends(get_db_postgres)
+            user_timezone: str = "UTC",
+            db: AsyncSession = Depends(get_db_postgres_reporting)
     ):
-        query_graphic = text(
-            """select 
-                    to_char(alert.created_at, 'MM/DD/YYYY') as created_date, 
-                    count(alert.id) as incidents_day,
-                    sum(alert.triggers) as sum_triggers
-                from rule_interface.alert as alert
-                where alert.tenant_id=:tenant_id and alert.trial = false and alert.created_at between \
-                :start_date and :end_date group by created_date"""
-        )
-
-        query_table = text(
-            """select alert.id, rule.name,
-                    to_char(alert.created_at, 'MM/DD/YYYY') as created_date, alert.triggers
-                from rule_interface.alert as alert
-                    inner join rule_interface.rule as rule on rule.id=alert.rule_id
-                where alert.tenant_id=:tenant_id and alert.trial = false and alert.created_at between \
-                :start_date and :end_date order by created_date, alert.id"""
-        )
-
         params = {
             "start_date": start_date.replace(tzinfo=None),
             "end_date": end_date.replace(tzinfo=None),
-            "tenant_id": tenant_id
+            "tenant_id": tenant_id,
+            "tz": user_timezone
         }
 
-        result_graphic = await db.execute(query_graphic, params)
-        result_graphic = result_graphic.fetchall()
+        # Single scan: the per-day incident and alert totals of the chart are
+        # summed while streaming the per-alert rows of the table, which come
+        # ordered by day.
+        result_graphic = []
+        result_table = []
+        async for row in report_queries.stream(
+                db, "incident_alerts_table", params):
+            result_table.append(row)
 
-        result_table = await db.execute(query_table, params)
-        result_table = result_table.fetchall()
+            if not result_graphic or result_graphic[-1][0] != row[2]:
+                result_graphic.append([row[2], 0, 0])
+            result_graphic[-1][1] += 1
+            result_graphic[-1][2] += row[3] or 0
 
         response = {
             "result_graphic": result_graphic,
@@ -57,79 +148,39 @@ class RuleService:
         return response
 
     @staticmethod
+    @cached_query("top_10_rules")
     async def get_top_10_rules(
             start_date: datetime,
             end_date: datetime,
             tenant_id: int,
-            db: AsyncSession = Depends(get_db_postgres)
+            user_timezone: str = "UTC",
+            db: AsyncSession = Depends(get_db_postgres_reporting)
     ):
-        query_general = text("""SELECT rule.id, rule.name, \
-              CASE WHEN rule.rule_type=1 THEN 'Match' WHEN rule.rule_type=2 THEN 'Threshold' \
-              WHEN rule.rule_type=3 THEN 'Correlation' WHEN rule.rule_type=4 THEN 'Advanced' END as type, \
-              sum(alert.triggers) as alerts FROM rule_interface.rule as rule \
-              INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id \
-              WHERE alert.tenant_id =:tenant_id and alert.created_at between :start_date and :end_date \
-              GROUP BY rule.id ORDER BY alerts DESC limit 10""")
-
-        query_match = text("""SELECT rule.id, rule.name, sum(alert.triggers) as alerts,
-              CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low' 
-              WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High' 
-              WHEN rule.severity=5 THEN 'Critical' END,
-              CASE WHEN rule.source=0 THEN 'Default' WHEN rule.source=1 THEN 'Tenant' WHEN rule.source=2 THEN 'Channel' END
-              FROM rule_interface.rule as rule 
-              INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id 
-              WHERE alert.tenant_id =:tenant_id and rule.rule_type = 1 and alert.created_at between :start_date and :end_date 
-              GROUP BY rule.id ORDER BY alerts DESC limit 10""")
-
-        query_threshold = text("""SELECT rule.id, rule.name, sum(alert.triggers) as alerts,
-              CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low' 
-              WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High' 
-              WHEN rule.severity=5 THEN 'Critical' END,
-              CASE WHEN rule.source=0 THEN 'Default' WHEN rule.source=1 THEN 'Tenant' WHEN rule.source=2 THEN 'Channel' END
-              FROM rule_interface.rule as rule 
-              INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id 
-              WHERE alert.tenant_id =:tenant_id and rule.rule_type = 2 and alert.created_at between :start_date and :end_date 
-              GROUP BY rule.id ORDER BY alerts DESC limit 10""")
-
-        query_correlated = text("""SELECT rule.id, rule.name, sum(alert.triggers) as alerts,
-              CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low' 
-              WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High' 
-              WHEN rule.severity=5 THEN 'Critical' END,
-              CASE WHEN rule.source=0 THEN 'Default' WHEN rule.source=1 THEN 'Tenant' WHEN rule.source=2 THEN 'Channel' END
-              FROM rule_interface.rule as rule 
-              INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id 
-              WHERE alert.tenant_id =:tenant_id and rule.rule_type = 3 and alert.created_at between :start_date and :end_date 
-              GROUP BY rule.id ORDER BY alerts DESC limit 10""")
-
-        query_advanced = text("""SELECT rule.id, rule.name, sum(alert.triggers) as alerts,
-              CASE WHEN rule.severity=1 THEN 'Info' WHEN rule.severity=2 THEN 'Low' 
-              WHEN rule.severity=3 THEN 'Medium' WHEN rule.severity=4 THEN 'High' 
-              WHEN rule.severity=5 THEN 'Critical' END,
-              CASE WHEN rule.source=0 THEN 'Default' WHEN rule.source=1 THEN 'Tenant' WHEN rule.source=2 THEN 'Channel' END
-              FROM rule_interface.rule as rule 
-              INNER JOIN rule_interface.alert as alert on alert.rule_id = rule.id 
-              WHERE alert.tenant_id =:tenant_id and rule.rule_type = 4 and alert.created_at between :start_date and :end_date 
-              GROUP BY rule.id ORDER BY alerts DESC limit 10""")
-
         params = {
             "start_date": start_date.replace(tzinfo=None),
             "end_date": end_date.replace(tzinfo=None),
-            "tenant_id": tenant_id
+            "tenant_id": tenant_id,
+            "tz": user_timezone
         }
 
-        result_general = await db.execute(query_general, params)
+        result_general = await report_queries.execute(
+            db, "top_10_rules_general", params)
         result_general = result_general.fetchall()
 
-        result_match = await db.execute(query_match, params)
+        result_match = await report_queries.execute(
+            db, "top_10_rules_by_type", {**params, "rule_type": 1})
         result_match = result_match.fetchall()
 
-        result_threshold = await db.execute(query_threshold, params)
+        result_threshold = await report_queries.execute(
+            db, "top_10_rules_by_type", {**params, "rule_type": 2})
         result_threshold = result_threshold.fetchall()
 
-        result_correlated = await db.execute(query_correlated, params)
+        result_correlated = await report_queries.execute(
+            db, "top_10_rules_by_type", {**params, "rule_type": 3})
         result_correlated = result_correlated.fetchall()
 
-        result_advanced = await db.execute(query_advanced, params)
+        result_advanced = await report_queries.execute(
+            db, "top_10_rules_by_type", {**params, "rule_type": 4})
         result_advanced = result_advanced.fetchall()
 
         response = {
@@ -141,3 +192,46 @@ class RuleService:
         }
 
         return response
+
+    @staticmethod
+    @cached_query("triggered_rules")
+    async def get_triggered_rules(
+            start_date: datetime,
+            end_date: datetime,
+            tenant_id: int,
+            user_timezone: str = "UTC",
+            db: AsyncSession = Depends(get_db_postgres_reporting)
+    ):
+        params = {
+            "start_date": start_date.replace(tzinfo=None),
+            "end_date": end_date.replace(tzinfo=None),
+            "tenant_id": tenant_id,
+            "tz": user_timezone
+        }
+
+        result = await report_queries.execute(db, "triggered_rules", params)
+
+        return result.fetchall()
+
+    @staticmethod
+    @cached_query("triggered_rules_series")
+    async def get_triggered_rules_series(
+            start_date: datetime,
+            end_date: datetime,
+            gap: str,
+            tenant_id: int,
+            user_timezone: str = "UTC",
+            db: AsyncSession = Depends(get_db_postgres_reporting)
+    ):
+        params = {
+            "start_date": start_date.replace(tzinfo=None),
+            "end_date": end_date.replace(tzinfo=None),
+            "tenant_id": tenant_id,
+            "tz": user_timezone,
+            **TRIGGERED_RULES_BUCKETS[gap]
+        }
+
+        result = await report_queries.execute(
+            db, "triggered_rules_series", params)
+
+        return result.fetchall()
@@ -80,7 +80,7 @@ async def report_render_content(data):
 
 
 async def __create_graphic_incidents(data):
-    x2 = data['data']['data_graphic']['dates']
+    x2 = [date.strftime("%m/%d/%Y") for date in data['data']['data_graphic']['dates']]
     y2 = data['data']['data_graphic']['sum_incidents']
     z2 = data['data']['data_graphic']['sum_alerts']
 
@@ -132,7 +132,7 @@ async def __create_table_incidents(data):
 
     for value in data["data"]["data_graphic"]["dates"]:
         total_alert_day = 0
-        data_print = value
+        data_print = value.strftime("%m/%d/%Y")
 
         line_date = '<tr class="dateDay">'
         line_date += '<td colspan="2"> <span class="small"> DATE </span> <span> ' + str(
@@ -0,0 +1,140 @@
+import base64
+
+import plotly.graph_objects as go
+from jinja2 import Environment, FileSystemLoader
+from weasyprint import HTML
+
+from domain.utils.format_date import formate_date
+
+# TEMPLATE INFO
+report_config = {
+    "en-US": {
+        "report_name": "Triggered Rules",
+        "description_title": "Summary introduction",
+        "description": "This report aims to present data and metrics related to the rules triggered in report during "
+                       "a designated time range. It includes a timeline of the triggers of the most triggered rules "
+                       "and the relation of triggers and hits of each rule.",
+        "results_title": "Results",
+        "time_range_title": "Time range",
+        "triggered_rules_chart_title": "Triggered Rules",
+        "triggered_rules_chart_description": "This section presents a timeline chart of the number of triggers of the"
+                                             " ten most triggered rules. The remaining rules are grouped as Others.",
+        "table_triggered_rules_title": "Main triggered rules",
+        "table_triggered_rules_description": "This section presents in a table the triggers and hits of each rule, "
+                                             "sorted by number of triggers. Triggers are the identified matches of a "
+                                             "rule, while hits are the logs received for them. Rules whose names "
+                                             "start with * are custom rules of the tenant.",
+        "contains_data": "There were no triggered rules in the designated time range."
+    }
+}
+
+
+async def report_render_content(data):
+    report_info = report_config[data['language']]
+    env = Environment(loader=FileSystemLoader(''))
+
+    start_date = data['data']['start_date'].strftime("%m/%d/%Y %H:%M")
+    end_date = data['data']['end_date'].strftime("%m/%d/%Y %H:%M")
+    date_generate = formate_date(data['generate_date'], data['user_timezone'], "%m/%d/%Y - %H:%M")
+
+    html = env.get_template("domain/templates/" + data['report_template'] + "/template_no_results.html")
+
+    template_vars = {
+        "report_name": report_info['report_name'],
+        "date_generate": date_generate,
+        "description_title": report_info['description_title'],
+        "description": report_info['description'],
+        "results_title": report_info['results_title'],
+        "contains_data": report_info['contains_data'],
+        "time_range_title": report_info['time_range_title'],
+        "start_date": start_date,
+        "end_date": end_date
+    }
+
+    if data['contains_data']:
+        html = env.get_template("domain/templates/" + data['report_template'] + "/template.html")
+
+        png_base64 = await __create_graphic_triggered_rules(data)
+
+        data_table_rules = await __create_table_triggered_rules(data)
+
+        template_vars = {
+            "report_name": report_info['report_name'],
+            "date_generate": date_generate,
+            "description_title": report_info['description_title'],
+            "description": report_info['description'],
+            "results_title": report_info['results_title'],
+            "time_range_title": report_info['time_range_title'],
+            "triggered_rules_chart_title": report_info['triggered_rules_chart_title'],
+            "triggered_rules_chart_description": report_info['triggered_rules_chart_description'],
+            "table_triggered_rules_title": report_info['table_triggered_rules_title'],
+            "table_triggered_rules_description": report_info['table_triggered_rules_description'],
+            "total_triggers": data_table_rules['total_triggers'],
+            "triggered_rules_table": data_table_rules['data_table'],
+            "chart_triggered_rules": png_base64,
+            "start_date": start_date,
+            "end_date": end_date
+        }
+
+    html = html.render(template_vars)
+    html = HTML(string=html)
+
+    return html
+
+
+async def __create_graphic_triggered_rules(data):
+    labels = data['data']['triggered_rules_chart']['labels']
+    datasets = data['data']['triggered_rules_chart']['datasets']
+
+    fig = go.Figure(
+        layout={'paper_bgcolor': 'rgba(0,0,0,0)', 'plot_bgcolor': 'rgba(0,0,0,0)',
+                'yaxis': dict(showline=False, showgrid=False, zeroline=False)})
+
+    for dataset in datasets:
+        fig.add_trace(
+            go.Scatter(
+                x=labels,
+                y=dataset['data'],
+                name=dataset['label'],
+                mode='lines',
+                marker_color=dataset['borderColor'],
+                marker_line_width=2.5
+            )
+        )
+
+    fig.update_layout(
+        width=1200,
+        height=700,
+        legend=dict(orientation="h"),
+        margin_t=0,
+        margin_r=0,
+        margin_l=0,
+        font_size=18
+    )
+
+    png_bytes = fig.to_image(format="png")
+    png_base64 = base64.b64encode(png_bytes).decode('ascii')
+
+    return png_base64
+
+
+async def __create_table_triggered_rules(data):
+    data_table = ""
+    total_triggers = 0
+
+    for rule in data["data"]["table_rules"]:
+        line = '<tr>'
+        line += '<td>' + str(rule['id']) + '</td>'
+        line += '<td class="ruleName">' + rule['name'] + '</td>'
+        line += '<td>' + str(rule['severity']) + '</td>'
+        line += '<td class="total">' + '{:,}'.format(rule['triggers']) + '</td>'
+        line += '<td class="total">' + '{:,}'.format(rule['hits']) + '</td>'
+        line += '</tr>'
+
+        total_triggers += rule['triggers']
+        data_table += line
+
+    return {
+        'total_triggers': '{:,}'.format(total_triggers),
+        'data_table': data_table
+    }
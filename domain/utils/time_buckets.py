@@ -0,0 +1,74 @@
+"""Vectorized time bucketing for chart series."""
+from datetime import datetime
+from typing import Sequence, Tuple
+
+import numpy as np
+
+# Gaps with a fixed length: left-closed bins labelled by their start.
+FIXED_GAPS = {
+    "1H": np.timedelta64(1, "h"),
+    "6H": np.timedelta64(6, "h"),
+    "1d": np.timedelta64(1, "D"),
+}
+
+# Calendar gaps: whole months / years labelled by their last day.
+CALENDAR_GAPS = {
+    "1M": "M",
+    "1Y": "Y",
+}
+
+
+def get_interval_bins(start_date: datetime, end_date: datetime,
+                      gap: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Get the interval labels and bin edges between two dates.
+
+    The intervals cover midnight of ``start_date`` up to the end of the day
+    of ``end_date``; calendar intervals cover whole months / years, the last
+    one included even when ``end_date`` falls before its end. Returns the
+    labels (``datetime64[s]``) and the bin edges, which have one more
+    element than the labels: timestamps in ``[edges[i], edges[i + 1])``
+    belong to ``labels[i]``.
+    """
+    first_day = np.datetime64(start_date.date(), "D")
+    last_day = np.datetime64(end_date.date(), "D")
+
+    if gap in FIXED_GAPS:
+        edges = np.arange(first_day.astype("datetime64[s]"),
+                          (last_day + 1).astype("datetime64[s]")
+                          + np.timedelta64(1, "s"),
+                          FIXED_GAPS[gap])
+        return edges[:-1], edges
+
+    unit = CALENDAR_GAPS[gap]
+    edges = np.arange(first_day.astype(f"datetime64[{unit}]"),
+                      last_day.astype(f"datetime64[{unit}]") + 2)
+    labels = edges[1:].astype("datetime64[D]") - np.timedelta64(1, "D")
+    return labels.astype("datetime64[s]"), edges.astype("datetime64[s]")
+
+
+def get_bucket_index(timestamps: Sequence[datetime],
+                     edges: np.ndarray) -> np.ndarray:
+    """Assign each timestamp to its bin, -1 when outside every bin."""
+    values = np.array([timestamp.replace(tzinfo=None)
+                       for timestamp in timestamps], dtype="datetime64[s]")
+
+    index = np.searchsorted(edges, values, side="right") - 1
+    index[index >= len(edges) - 1] = -1
+    return index
+
+
+def aggregate_by_key(keys: np.ndarray, buckets: np.ndarray,
+                     values: np.ndarray, number_keys: int,
+                     number_buckets: int) -> np.ndarray:
+    """Sum the values of each (key, bucket) pair into a keys x buckets grid.
+
+    ``keys`` are integer codes in ``[0, number_keys)``; rows whose bucket is
+    -1 are ignored.
+    """
+    in_range = buckets >= 0
+    totals = np.bincount(
+        keys[in_range] * number_buckets + buckets[in_range],
+        weights=values[in_range],
+        minlength=number_keys * number_buckets
+    )
+    return totals.reshape(number_keys, number_buckets).astype(np.int64)
@@ -1,6 +1,6 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import report, report_services
+from routers import metrics, report, report_services
 
 import sentry_sdk
 
@@ -46,6 +46,7 @@ def raiz():
 app.include_router(report.router, prefix="/api")
 # In production this is not sampled
 app.include_router(report_services.router, prefix="/api")
+app.include_router(metrics.router, prefix="/api")
 
 app.openapi = harpia_openapi(app)
 customization_setup(app)
@@ -6,6 +6,7 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 from sqlalchemy.ext.asyncio import AsyncEngine
 
+from models.outbox import OutboxEvent
 from models.report import Report
 from models.report_type import ReportType
 
@@ -0,0 +1,44 @@
+"""report trigram indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-19 10:12:31.402518
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Trigram indexes serve the substring (ILIKE '%value%') filters of the
+    # report list, which can not use a btree index.
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    # Built concurrently so the report table stays writable meanwhile;
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index('ix_report_name_trgm', 'report', ['name'],
+                        unique=False, schema='report_interface',
+                        postgresql_using='gin',
+                        postgresql_ops={'name': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+        op.create_index('ix_report_created_by_trgm', 'report', ['created_by'],
+                        unique=False, schema='report_interface',
+                        postgresql_using='gin',
+                        postgresql_ops={'created_by': 'gin_trgm_ops'},
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_report_created_by_trgm', table_name='report',
+                      schema='report_interface',
+                      postgresql_concurrently=True)
+        op.drop_index('ix_report_name_trgm', table_name='report',
+                      schema='report_interface',
+                      postgresql_concurrently=True)
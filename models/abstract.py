@@ -1,21 +1,30 @@
 """Base model implementation."""
+import asyncio
+import base64
 import importlib
+import json
 import uuid
 from datetime import datetime
 from distutils import util
 from math import ceil
-from typing import Union, List, Any
+from typing import Union, List, Any, Dict
 import sqlalchemy
 from prettyconf import config
-from sqlalchemy import Column, Integer, String, Boolean, cast, inspect, and_, Float, select, func, or_
+from sqlalchemy import Column, Integer, String, Boolean, cast, inspect, and_, Float, select, func, or_, false
 from sqlalchemy import DateTime
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import QueryableAttribute
-from sqlalchemy.sql import expression, Select, ColumnElement
+from sqlalchemy.sql import expression, operators, Select, ColumnElement
 from sqlalchemy.sql.elements import UnaryExpression
 
 from db.postgres import Base
+from utils.cache import CountCache
+
+
+def _escape_like(value: str) -> str:
+    """Escape the LIKE wildcards of a value."""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class BaseModel(Base):
@@ -32,11 +41,20 @@ class BaseModel(Base):
 class FilteredListDTOMixin:
     """Mixin for filtered / paginated list on DTO classes."""
 
+    # Resolved filter paths and sort expressions, shared by every instance of
+    # a DTO class, so a repeated query shape only binds the new values. Only
+    # keys that resolve are kept, which bounds them to the model fields.
+    _filter_paths: Dict[tuple, tuple] = {}
+    _sort_expressions: Dict[tuple, UnaryExpression] = {}
+
     def __init__(self):
         self.session: Union[AsyncSession, None] = None
         self.model: Union[BaseModel, None] = None
         self.base_query: Union[Select, None] = None
         self.specific_count_query: Union[Select, None] = None
+        self.count_cache: Union[CountCache, None] = None
+        self.count_scope: Any = None
+        self.projection: Union[List[QueryableAttribute], None] = None
 
     async def get_all_with_filters(
             self,
@@ -44,34 +62,264 @@ class FilteredListDTOMixin:
             page_size: int = 100,
             filters: Union[List[str], None] = None,
             sorts: Union[List[str], None] = None,
+            cursor: Union[str, None] = None,
+            count_mode: str = "exact",
             *args,
             **kwargs
     ):
-        """Get all records with pagination, optional filters and sort order."""
-        skip = page_size * (page - 1)
-        filtered_query = self._get_filtered_query(filters, sorts)
+        """Get all records with pagination, optional filters and sort order.
 
-        count_query = select(func.count()).select_from(filtered_query)
-        result_query = filtered_query.offset(skip).limit(page_size)
+        When ``cursor`` is given (an empty string for the first page) records
+        are paged with seek predicates on the sort keys instead of an offset,
+        and the response carries the ``next_cursor`` of the following page.
 
-        if self.specific_count_query is not None:
-            count_query = select(func.count()).select_from(
-                self.specific_count_query)
+        ``count_mode`` selects how the total is computed: ``exact``,
+        ``estimated`` (planner estimate, unfiltered queries only), ``cached``
+        (through ``count_cache``) or ``none``; ``count_exact`` tells whether
+        the returned count is exact.
 
-        count = await self.session.execute(count_query)
-        count_result = count.scalar_one()
+        When ``projection`` is set only those columns are selected, as Core
+        rows, and the records are returned as plain dicts instead of model
+        instances.
+        """
+        if cursor is None:
+            filtered_query = self._get_filtered_query(filters, sorts)
+            result_query = filtered_query.offset(page_size * (page - 1))
+        else:
+            filtered_query = self._get_filtered_query(filters)
+            sort_keys = self._get_sort_keys(sorts)
+            result_query = filtered_query.order_by(
+                *[expression.desc(column) if descending else expression.asc(column)
+                  for column, descending in sort_keys])
+            if cursor:
+                result_query = result_query.filter(
+                    self._get_seek_predicate(sort_keys, self._decode_cursor(cursor, sort_keys)))
+            page = None
+
+        result_query = result_query.limit(page_size if cursor is None else page_size + 1)
+
+        if self.projection is not None:
+            columns = list(self.projection)
+            if cursor is not None:
+                keys = {column.key for column in columns}
+                columns += [column for column, _ in sort_keys if column.key not in keys]
+            result_query = result_query.with_only_columns(*columns)
+
+        # The count runs concurrently with the page query on a second pool
+        # connection, but only when the pool has an idle one: otherwise it
+        # runs afterwards on the same session, so a saturated pool is not
+        # asked for two connections per list request.
+        if self._has_idle_connection():
+            (count_result, count_exact), result = await asyncio.gather(
+                self._count_records(filtered_query, filters, count_mode, True),
+                self.session.execute(result_query))
+        else:
+            result = await self.session.execute(result_query)
+            count_result, count_exact = await self._count_records(
+                filtered_query, filters, count_mode, False)
+        if self.projection is not None:
+            records_result = result.all()
+        else:
+            records_result = result.scalars().unique().all()
 
-        result = await self.session.execute(result_query)
-        records_result = result.scalars().unique().all()
+        next_cursor = None
+        if cursor is not None and len(records_result) > page_size:
+            records_result = records_result[:page_size]
+            next_cursor = self._encode_cursor(records_result[-1], sort_keys)
+
+        if self.projection is not None:
+            records_result = [{column.key: row._mapping[column.key] for column in self.projection}
+                              for row in records_result]
 
         return {
             "current_page": page,
             "page_size": page_size,
-            "number_pages": ceil(count_result / page_size),
+            "number_pages": ceil(count_result / page_size) if count_result is not None else None,
             "count": count_result,
+            "count_exact": count_exact,
+            "next_cursor": next_cursor,
             "records": records_result
         }
 
+    def _has_idle_connection(self) -> bool:
+        return self.session.bind.sync_engine.pool.checkedin() > 0
+
+    async def _count_records(
+            self,
+            filtered_query: Select,
+            filters: Union[List[str], None],
+            count_mode: str,
+            own_session: bool
+    ) -> tuple:
+        """(count, exact) of the filtered records, according to count_mode.
+
+        With ``own_session`` the count runs on a new session, which checks
+        out a second connection of the pool.
+        """
+        if count_mode == "none":
+            return None, False
+
+        if count_mode == "cached" and self.count_cache is not None:
+            count = await self.count_cache.get(self.count_scope, filters)
+            if count is not None:
+                return count, False
+
+        if own_session:
+            async with AsyncSession(self.session.bind) as session:
+                count, exact = await self._query_count(
+                    session, filtered_query, filters, count_mode)
+        else:
+            count, exact = await self._query_count(
+                self.session, filtered_query, filters, count_mode)
+
+        if exact and count_mode == "cached" and self.count_cache is not None:
+            await self.count_cache.set(self.count_scope, filters, count)
+
+        return count, exact
+
+    async def _query_count(
+            self,
+            session: AsyncSession,
+            filtered_query: Select,
+            filters: Union[List[str], None],
+            count_mode: str
+    ) -> tuple:
+        if count_mode == "estimated" and not filters:
+            return await self._estimate_count(session, filtered_query), False
+
+        count_query = select(func.count()).select_from(filtered_query)
+        if self.specific_count_query is not None:
+            count_query = select(func.count()).select_from(
+                self.specific_count_query)
+
+        count = await session.execute(count_query)
+        return count.scalar_one(), True
+
+    @staticmethod
+    async def _estimate_count(session: AsyncSession, query: Select) -> int:
+        """Row estimate of the query plan, without running the query.
+
+        The compiled query is run with its bound parameters, prefixed with
+        EXPLAIN, directly on the driver.
+        """
+        compiled = query.compile(dialect=session.bind.dialect)
+        parameters = compiled.construct_params()
+        if compiled.positional:
+            parameters = tuple(parameters[name] for name in compiled.positiontup)
+
+        connection = await session.connection()
+        result = await connection.exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", parameters)
+
+        plan = result.scalar_one()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
+
+    def _get_sort_keys(self, sorts: Union[List[str], None]) -> List[tuple]:
+        """(column, descending) pairs of the sort order, for seek pagination.
+
+        Only columns of the model itself can be used as keys; the primary key
+        is appended when missing so the order is total.
+        """
+        sort_keys = []
+        for sort in self._process_sorts(sorts or []):
+            column = sort.element
+            if column.table is not self.model.__table__ or \
+                    any(column.key == key.key for key, _ in sort_keys):
+                continue
+            sort_keys.append((column, sort.modifier is operators.desc_op))
+
+        for column in inspect(self.model).primary_key:
+            if not any(column.key == key.key for key, _ in sort_keys):
+                sort_keys.append((column, False))
+
+        return sort_keys
+
+    @staticmethod
+    def _get_seek_predicate(sort_keys: List[tuple], values: List[Any]) -> ColumnElement:
+        """Rows placed after ``values`` in the sort order.
+
+        Follows the Postgres defaults: NULLs come last when ascending and
+        first when descending.
+        """
+        clauses = []
+        equals = []
+        for (column, descending), value in zip(sort_keys, values):
+            nullable = getattr(column, "nullable", True)
+
+            if descending:
+                after = column.isnot(None) if value is None else column < value
+            elif value is None:
+                after = None
+            elif nullable:
+                after = or_(column > value, column.is_(None))
+            else:
+                after = column > value
+
+            if after is not None:
+                clauses.append(and_(*equals, after))
+            equals.append(column.is_(None) if value is None else column == value)
+
+        return or_(*clauses) if clauses else false()
+
+    @staticmethod
+    def _encode_cursor(record, sort_keys: List[tuple]) -> str:
+        values = [getattr(record, column.key) for column, _ in sort_keys]
+        data = json.dumps(values, default=str, separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def _decode_cursor(cursor: str, sort_keys: List[tuple]) -> List[Any]:
+        """Values of the sort keys stored in a cursor; ValueError if invalid."""
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        except Exception as err:
+            raise ValueError(f"Invalid cursor: {err}")
+
+        if not isinstance(values, list) or len(values) != len(sort_keys):
+            raise ValueError("Invalid cursor: it does not match the sort order")
+
+        return [FilteredListDTOMixin._decode_cursor_value(column, value)
+                for (column, _), value in zip(sort_keys, values)]
+
+    @staticmethod
+    def _decode_cursor_value(column, value: Any) -> Any:
+        """Cursor value of a sort key as the column type; ValueError if it
+        does not fit the column."""
+        if value is None:
+            return None
+
+        try:
+            python_type = uuid.UUID if isinstance(column.type, UUID) \
+                else column.type.python_type
+        except NotImplementedError:
+            return value
+
+        # JSON keeps ints, floats, bools and strings; the rest was encoded
+        # as strings
+        if python_type is bool:
+            valid = isinstance(value, bool)
+        elif python_type is int:
+            valid = isinstance(value, int) and not isinstance(value, bool)
+        elif python_type is float:
+            valid = isinstance(value, (int, float)) and not isinstance(value, bool)
+            value = float(value) if valid else value
+        elif python_type is str:
+            valid = isinstance(value, str)
+        else:
+            valid = isinstance(value, str)
+            if valid:
+                try:
+                    # datetime, date and time are encoded in ISO format
+                    value = getattr(python_type, "fromisoformat", python_type)(value)
+                except (TypeError, ValueError, ArithmeticError):
+                    valid = False
+
+        if not valid:
+            raise ValueError(f"Invalid cursor: bad value for {column.key}")
+        return value
+
     def _get_filtered_query(
             self,
             filters: Union[List[str], None] = None,
@@ -118,33 +366,68 @@ class FilteredListDTOMixin:
         value (str): The value to be checked against
         Will be cast to a corresponding field type
         """
-        model = self._get_model_class(model)
+        path = self._filter_paths.get((type(self), model, key))
+        if path is None:
+            path = self._resolve_filter_path(model, key)
+            self._filter_paths[(type(self), model, key)] = path
+
+        relationships, field, python_type = path
+        if field is None:
+            return None
+
+        statement = self._get_filter_statement(field, value, python_type)
+
+        # The 'comparator.property.uselist' as True means 'related' is a "to Many" relationship,
+        # i.e. related has a collection on the other side.
+        # if uselist is True, should use 'any()' instead of 'has()':
+        # TODO Both related.any() and related.has() use sub queries, that tend to be slow...
+        #  see https://stackoverflow.com/a/8562155/1786389
+        for related in reversed(relationships):
+            if related.comparator.property.uselist:
+                statement = related.any(statement)
+            else:
+                statement = related.has(statement)
 
-        if key.find(".") == -1:
-            field = inspect(model.__dict__[key])
+        return statement
 
-            if isinstance(field.property, sqlalchemy.orm.properties.ColumnProperty):
-                return self._get_filter_statement(field, value)
+    def _resolve_filter_path(self, model: BaseModel, key: str) -> tuple:
+        """Resolves a filter key into (relationships, field, python type)
 
-        else:
-            rel, skey = key.split(".", 1)
+        Relationships are walked in order from the model down to the model
+        that owns the field; field is None when the key is not a column.
+        """
+        relationships = []
+        while True:
+            model = self._get_model_class(model)
+
+            if key.find(".") == -1:
+                break
+
+            rel, key = key.split(".", 1)
             related = inspect(model.__dict__[rel])
 
-            related_model = related.property.argument
-            sub_query = self._process_single_filter(related_model, skey, value)
+            relationships.append(related)
+            model = related.property.argument
 
-            # The 'comparator.property.uselist' as True means 'related' is a "to Many" relationship,
-            # i.e. related has a collection on the other side.
-            # if uselist is True, should use 'any()' instead of 'has()':
-            # TODO Both related.any() and related.has() use sub queries, that tend to be slow...
-            #  see https://stackoverflow.com/a/8562155/1786389
-            if related.comparator.property.uselist:
-                return related.any(sub_query)
-            else:
-                return related.has(sub_query)
+        field = inspect(model.__dict__[key])
+        if not isinstance(field.property, sqlalchemy.orm.properties.ColumnProperty):
+            return relationships, None, None
+
+        return relationships, field, self._get_python_type(field)
 
     @staticmethod
-    def _get_filter_statement(field: QueryableAttribute, value: Any) -> ColumnElement:
+    def _get_python_type(field: QueryableAttribute) -> Any:
+        field_type = field.property.columns[0].type
+
+        # Need to account for sqlalchemy.dialects.postgresql.base fields,
+        # because they ARE NOT the same interface of sqlalchemy.sql.sqltypes
+        if isinstance(field_type, UUID):
+            return uuid
+        return field_type.python_type
+
+    @classmethod
+    def _get_filter_statement(cls, field: QueryableAttribute, value: Any,
+                              python_type: Any = None) -> ColumnElement:
         """Generates a statement for filters
 
         Uses the correct comparative operator according to the field type
@@ -158,19 +441,15 @@ class FilteredListDTOMixin:
         Will be cast to a corresponding field type; If the value appears to be
         a list, will cast each list item to the corresponding type.
 
+        python_type (Any): The python type of the field, when already known
+
         Returns:
         statement (ColumnElement) the comparative statement
         """
         value_as_list = value.split(',')
 
-        field_type = field.property.columns[0].type
-
-        # Need to account for sqlalchemy.dialects.postgresql.base fields,
-        # because they ARE NOT the same interface of sqlalchemy.sql.sqltypes
-        if isinstance(field_type, UUID):
-            python_type = uuid
-        else:
-            python_type = field_type.python_type
+        if python_type is None:
+            python_type = cls._get_python_type(field)
 
         # To provide more reliable results, bool values will NOT work as lists:
         if python_type is bool:
@@ -181,9 +460,11 @@ class FilteredListDTOMixin:
         elif python_type is float:
             return cast(field, Float).in_([float(x) for x in value_as_list])
         elif python_type is str:
+            # No cast on string columns, so trigram indexes can serve the
+            # ILIKE; wildcards in the value are matched literally.
             statements = []
             for v in value_as_list:
-                statements.append(cast(field, String).ilike("%" + v + "%"))
+                statements.append(field.ilike("%" + _escape_like(v) + "%", escape="\\"))
             return or_(*statements)
         # by default, filter is converted as a string field:
         return cast(field, String).in_([str(x) for x in value_as_list])
@@ -196,7 +477,12 @@ class FilteredListDTOMixin:
                     field, direction = sort_param, "ASC"
                 else:
                     field, direction = sort_param.split(":", 1)
-                exp = self._process_single_sort(self.model, field, direction)
+                direction = "DESC" if direction.upper() == "DESC" else "ASC"
+
+                exp = self._sort_expressions.get((type(self), field, direction))
+                if exp is None:
+                    exp = self._process_single_sort(self.model, field, direction)
+                    self._sort_expressions[(type(self), field, direction)] = exp
                 processed_sorts.append(exp)
 
             except (KeyError, Exception) as _:
@@ -0,0 +1,96 @@
+"""Outbox of the events published about the reports."""
+import uuid
+from datetime import datetime
+from typing import List, Tuple
+
+from prettyconf import config
+from sqlalchemy import BigInteger, Column, DateTime, Index, Integer, String, \
+    bindparam, delete, insert, select, text, update
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.postgres import Base
+
+
+class OutboxEvent(Base):
+    """Event waiting to be published to Kafka.
+
+    Rows are written in the transaction of the change they describe and
+    deleted by the relay once Kafka acknowledged them.
+    """
+    __tablename__ = "outbox_event"
+    __table_args__ = (
+        # Pending events, in relay order
+        Index("ix_outbox_event_pending", "id",
+              postgresql_where=text("parked_at IS NULL")),
+        {"schema": config("POSTGRES_SCHEMA")}
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    # Published as the message flow_id, the same on every redelivery
+    flow_id = Column(UUID(as_uuid=True), nullable=False, default=uuid.uuid4)
+    name = Column(String, nullable=False)
+    topic = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(String, nullable=True)
+    # Set once the event failed too many times; it is no longer relayed
+    parked_at = Column(DateTime, nullable=True)
+
+
+class OutboxDTO:
+    """Outbox data transfer object."""
+
+    def __init__(self, session: AsyncSession) -> None:
+        """Class initialization."""
+        self.session = session
+
+    async def add(self, messages: List[dict]) -> None:
+        """Add messages ({name, topic, payload}) to the current transaction,
+        with a single INSERT."""
+        if messages:
+            await self.session.execute(insert(OutboxEvent).values([
+                {"name": message["name"], "topic": message["topic"],
+                 "payload": message.get("payload")}
+                for message in messages]))
+
+    async def lock_batch(self, size: int) -> List[OutboxEvent]:
+        """Oldest events not parked, locked until the transaction ends.
+
+        Rows locked by another relay are skipped, so several instances can
+        drain the outbox without publishing the same event twice.
+        """
+        query = select(OutboxEvent).where(OutboxEvent.parked_at.is_(None)) \
+            .order_by(OutboxEvent.id).limit(size) \
+            .with_for_update(skip_locked=True)
+        result = await self.session.execute(query)
+        return result.scalars().all()
+
+    async def delete(self, ids: List[int]) -> None:
+        if ids:
+            await self.session.execute(
+                delete(OutboxEvent).where(OutboxEvent.id.in_(ids)))
+
+    async def record_failures(self, failures: List[Tuple[OutboxEvent, str]],
+                              max_attempts: int) -> List[OutboxEvent]:
+        """Count a failed attempt of each event, parking the events that
+        reached ``max_attempts``. Returns the parked events."""
+        if not failures:
+            return []
+
+        now = datetime.utcnow()
+        parked = [event for event, _ in failures
+                  if event.attempts + 1 >= max_attempts]
+        table = OutboxEvent.__table__
+        query = update(table).where(table.c.id == bindparam("event_id")) \
+            .values(attempts=bindparam("event_attempts"),
+                    last_error=bindparam("event_error"),
+                    parked_at=bindparam("event_parked_at"))
+        await self.session.execute(query, [{
+            "event_id": event.id,
+            "event_attempts": event.attempts + 1,
+            "event_error": error,
+            "event_parked_at": now if event in parked else None
+        } for event, error in failures])
+        return parked
@@ -1,15 +1,29 @@
 """Report model implementations."""
 import enum
-from typing import List, Union
+import logging
+from typing import Awaitable, Callable, List, Union
 
 from prettyconf import config
-from sqlalchemy import Column, Integer, String, select, DateTime, distinct, ForeignKey
+from sqlalchemy import BigInteger, Column, Integer, String, select, DateTime, distinct, ForeignKey, \
+    Index, insert, func
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import relationship
 
+from db.postgres import Base
 from models.abstract import BaseModel, FilteredListDTOMixin
+from models.outbox import OutboxDTO
 from models.report_type import ReportType
-from utils.common import database_commit
+from schemas.report import ReportOutput
+from utils.cache import CountCache, FacetCache
+
+# Builds the outbox messages ({name, topic, payload}) of a new report
+EventsBuilder = Callable[..., Awaitable[List[dict]]]
+
+# Per-tenant report counts, dropped whenever a report is created.
+report_count_cache = CountCache("report")
+# Per-tenant values of the filterable fields, kept up to date on create.
+report_facet_cache = FacetCache("report")
 
 
 class Status(enum.Enum):
@@ -22,7 +36,14 @@ class Status(enum.Enum):
 class Report(BaseModel):
     """Report model."""
     __tablename__ = "report"
-    __table_args__ = {"schema": config("POSTGRES_SCHEMA")}
+    __table_args__ = (
+        # Trigram indexes for the substring filters (requires pg_trgm)
+        Index("ix_report_name_trgm", "name", postgresql_using="gin",
+              postgresql_ops={"name": "gin_trgm_ops"}),
+        Index("ix_report_created_by_trgm", "created_by", postgresql_using="gin",
+              postgresql_ops={"created_by": "gin_trgm_ops"}),
+        {"schema": config("POSTGRES_SCHEMA")}
+    )
 
     id = Column(Integer, primary_key=True)
     name = Column(String, nullable=True)
@@ -35,6 +56,26 @@ class Report(BaseModel):
     report_type = relationship(ReportType)
 
 
+class ReportVersion(Base):
+    """Per-tenant version of the reports.
+
+    Bumped by triggers whenever reports are inserted or a report status
+    changes, including the status writes of the report workers.
+    """
+    __tablename__ = "report_version"
+    __table_args__ = {"schema": config("POSTGRES_SCHEMA")}
+
+    tenant_id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(BigInteger, nullable=False, default=0)
+
+
+# Fields whose distinct values are offered as available filters. Only fields
+# set on create belong here, since the cache is updated on create only.
+REPORT_FACETS = {
+    "created_by": Report.created_by,
+}
+
+
 class ReportDTO(FilteredListDTOMixin):
     """Report data transfer object."""
 
@@ -46,10 +87,77 @@ class ReportDTO(FilteredListDTOMixin):
         self.tenant_id = tenant_id
         self.session = session
         self.model = Report
+        self.count_cache = report_count_cache
+        self.count_scope = tenant_id
+        # The list only needs the ReportOutput columns
+        self.projection = [getattr(Report, field) for field in ReportOutput.__fields__]
 
-    async def create(self, report: Report) -> None:
-        """Create report."""
-        await database_commit(self.session, report)
+    async def create(self, report: Report,
+                     events: Union[EventsBuilder, None] = None) -> None:
+        """Create report.
+
+        The messages returned by ``events(report)``, once the report has its
+        id, are written to the outbox in the same transaction.
+        """
+        try:
+            self.session.add(report)
+            await self.session.flush()
+            if events is not None:
+                await OutboxDTO(self.session).add(await events(report))
+            await self.session.commit()
+            await self.session.refresh(report)
+        except SQLAlchemyError as err:
+            await self.session.rollback()
+            logging.error(f"Error on create: {type(err)} {err}")
+            raise err
+
+        await report_count_cache.invalidate(report.tenant_id)
+        await report_facet_cache.add(report.tenant_id, {
+            field: getattr(report, column.key)
+            for field, column in REPORT_FACETS.items()})
+
+    async def create_many(self, reports: List[dict],
+                          events: Union[EventsBuilder, None] = None) -> list:
+        """Create reports with a single multi-row INSERT ... RETURNING.
+
+        Returns the (id, type) rows of the new reports, in the given order.
+        The messages returned by ``events(report, row)`` for each report are
+        written to the outbox in the same transaction.
+        """
+        try:
+            # Postgres does not return the rows of a multi-row INSERT in the
+            # VALUES order, so the ids are taken from the sequence first and
+            # the returned rows are matched back by id.
+            sequence = func.pg_get_serial_sequence(Report.__table__.fullname,
+                                                   Report.id.key)
+            result = await self.session.execute(
+                select(func.nextval(sequence))
+                .select_from(func.generate_series(1, len(reports))))
+            ids = result.scalars().all()
+
+            query = insert(Report).values([
+                {**report, "id": report_id} for report, report_id in zip(reports, ids)
+            ]).returning(Report.id, Report.type)
+            result = await self.session.execute(query)
+            rows = {row.id: row for row in result}
+            new_reports = [rows[report_id] for report_id in ids]
+            if events is not None:
+                messages = []
+                for report, new_report in zip(reports, new_reports):
+                    messages.extend(await events(report, new_report))
+                await OutboxDTO(self.session).add(messages)
+            await self.session.commit()
+        except SQLAlchemyError as err:
+            await self.session.rollback()
+            logging.error(f"Error on create_many: {type(err)} {err}")
+            raise err
+
+        await report_count_cache.invalidate(self.tenant_id)
+        for values in {tuple(report.get(column.key) for column in REPORT_FACETS.values())
+                       for report in reports}:
+            await report_facet_cache.add(self.tenant_id, dict(zip(REPORT_FACETS, values)))
+
+        return new_reports
 
     async def get_all_with_filters(
             self,
@@ -58,6 +166,8 @@ class ReportDTO(FilteredListDTOMixin):
             page_size: int = 100,
             filters: Union[List[str], None] = None,
             sorts: Union[List[str], None] = None,
+            cursor: Union[str, None] = None,
+            count_mode: str = "exact",
             *args,
             **kwargs
     ):
@@ -70,9 +180,29 @@ class ReportDTO(FilteredListDTOMixin):
             filters.append(f"tenants.code:{tenant_code}")
 
         sorts.append('id:DESC')
-        return await super().get_all_with_filters(page, page_size, filters, sorts)
+        return await super().get_all_with_filters(page, page_size, filters, sorts, cursor,
+                                                   count_mode)
 
-    async def get_unique_created_by_values(self):
-        query = select(distinct(Report.created_by)).where(Report.tenant_id == self.tenant_id)
+    async def get_version(self) -> int:
+        """Current version of the tenant reports."""
+        query = select(ReportVersion.version).where(
+            ReportVersion.tenant_id == self.tenant_id)
+        result = await self.session.execute(query)
+        return result.scalar() or 0
+
+    async def get_unique_values(self, column):
+        query = select(distinct(column)).where(Report.tenant_id == self.tenant_id)
         result = await self.session.execute(query)
         return result.scalars().unique().all()
+
+    async def get_facet_values(self) -> dict:
+        """Distinct values of each REPORT_FACETS field, from the cache."""
+        facets = await report_facet_cache.get(self.tenant_id, list(REPORT_FACETS))
+
+        if facets is None:
+            generation = await report_facet_cache.generation(self.tenant_id)
+            facets = {field: await self.get_unique_values(column)
+                      for field, column in REPORT_FACETS.items()}
+            await report_facet_cache.set(self.tenant_id, facets, generation)
+
+        return facets
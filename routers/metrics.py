@@ -0,0 +1,15 @@
+"""Service metrics routes."""
+from fastapi import APIRouter, Depends
+
+from utils.auth_jwt import CachedAuthJWT
+from utils.metrics import metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get("/v1/metrics")
+async def get_metrics(jwt_auth: CachedAuthJWT = Depends()):
+    """Snapshot of the in-process service metrics."""
+    jwt_auth.jwt_required()
+
+    return metrics.snapshot()
@@ -1,21 +1,24 @@
+import asyncio
 import logging
 from datetime import datetime
 
 from aiohttp import ClientSession
-from fastapi import APIRouter, Depends, Path, Request
-from fastapi_jwt_auth import AuthJWT
+from fastapi import APIRouter, Depends, Header, Path, Request, Response
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 
-from domain.get_session_info import get_tenant_session_info
+from domain.get_session_info import get_tenant_session_info, \
+    TENANT_CLAIMS_HEADER
 from domain.get_user_profiles import get_user_profiles_by_email
-from domain.kafka_producer import publish_message
-from domain.services.report_service import ReportService
+from domain.services.report_service import ReportService, \
+    report_list_responses
 from models.report import Report
 from schemas.report import PaginatedReportListOutput, \
-    ReportCreate as ReportCreateSchema
+    ReportCreate as ReportCreateSchema, ReportBulkCreate
+from utils.auth_jwt import CachedAuthJWT
 from utils.common import common_filter_parameters, get_db_postgres, \
-    aiohttp_client_session, http_exception
+    aiohttp_client_session, http_exception, gather_with_deadline
 from utils.fastapi_limiter import default_user_identifier
 from utils.responses.report_responses import response_reports
 
@@ -27,12 +30,15 @@ router = APIRouter(tags=["Reports"])
             response_model=PaginatedReportListOutput
             )
 async def list_reports(
+        request: Request,
         tenant_code: str = Path(
             None,
             title="Tenant code",
             description="Code of the tenant from which will display records"),
         filter_parameters: dict = Depends(common_filter_parameters),
-        jwt_auth: AuthJWT = Depends(),
+        if_none_match: str = Header(None),
+        tenant_claims: str = Header(None, alias=TENANT_CLAIMS_HEADER),
+        jwt_auth: CachedAuthJWT = Depends(),
         session: AsyncSession = Depends(get_db_postgres),
         async_client: ClientSession = Depends(aiohttp_client_session)
 ):
@@ -40,26 +46,55 @@ async def list_reports(
     jwt_auth.jwt_required()
 
     # Validate Tenant access
-    tenant = await get_tenant_session_info(
-        tenant_code=tenant_code,
-        jwt_token=jwt_auth.__dict__[
-            "_token"],
-        client_session=async_client
-    )
+    try:
+        tenant = await get_tenant_session_info(
+            tenant_code=tenant_code,
+            jwt_token=jwt_auth.__dict__[
+                "_token"],
+            client_session=async_client,
+            claims=jwt_auth.get_raw_jwt(),
+            tenant_claims_token=tenant_claims
+        )
+    except asyncio.TimeoutError:
+        raise http_exception(message="Upstream services timed out",
+                             status=status.HTTP_504_GATEWAY_TIMEOUT)
     tenant_id = tenant["tenant_id"]
 
+    report_service = ReportService(session, tenant_id)
+
+    # Polls of an unchanged list cost a version lookup instead of the query
+    etag = await report_service.get_list_etag(request.url.query)
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                        headers={"ETag": etag})
+
+    body = report_list_responses.get((tenant_id, etag))
+    if body is not None:
+        return Response(content=body, media_type="application/json",
+                        headers={"ETag": etag})
+
     report_parameters = {
         "tenant_id": tenant_id,
         "page": filter_parameters.get("page"),
         "page_size": filter_parameters.get("page_size"),
         "filters": filter_parameters.get("filters"),
-        "sorts": filter_parameters.get("sorts")
+        "sorts": filter_parameters.get("sorts"),
+        "cursor": filter_parameters.get("cursor"),
+        "count_mode": filter_parameters.get("count_mode")
     }
 
-    report_service = ReportService(session, tenant_id)
-    result = await report_service.get_all_reports(report_parameters)
+    try:
+        result = await report_service.get_all_reports(report_parameters)
 
-    return result
+    except ValueError as e:
+        raise http_exception(message=str(e),
+                             status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+    # Records are already plain rows of the PaginatedReportListOutput fields,
+    # so they are encoded directly instead of validated by response_model.
+    response = ORJSONResponse(content=result, headers={"ETag": etag})
+    report_list_responses.set((tenant_id, etag), response.body)
+    return response
 
 
 @router.post("/v1/{tenant_code}/reports",
@@ -71,36 +106,16 @@ async def register_report(
             None,
             title="Tenant code",
             description="Code of the tenant from which will display records"),
-        jwt_auth: AuthJWT = Depends(),
+        tenant_claims: str = Header(None, alias=TENANT_CLAIMS_HEADER),
+        jwt_auth: CachedAuthJWT = Depends(),
         session: AsyncSession = Depends(get_db_postgres),
         async_client: ClientSession = Depends(aiohttp_client_session)
 ):
     """Register a match report."""
     jwt_auth.jwt_required()
 
-    tenant = await get_tenant_session_info(
-        tenant_code=tenant_code,
-        jwt_token=jwt_auth.__dict__[
-            "_token"],
-        client_session=async_client
-    )
-
-    decoded = jwt_auth.get_raw_jwt(jwt_auth.__dict__["_token"])
-    user_email = decoded.get("sub").split(":")[0]
-
-    user = await get_user_profiles_by_email(
-        email=user_email,
-        tenant_code=tenant_code,
-        jwt_token=jwt_auth.__dict__[
-            "_token"],
-        client_session=async_client
-    )
-
-    user_timezone = user["timezone"] if user["timezone"] != "Default device" else "UTC"
-    user_timezone_ = user_timezone.replace("/", "@") if user_timezone.find(
-        "/") else user_timezone
-
-    tenant_id = tenant["tenant_id"]
+    tenant_id, user_email, user, user_timezone_ = await get_report_author(
+        tenant_code, tenant_claims, jwt_auth, async_client)
 
     report_service = ReportService(session, tenant_id)
 
@@ -115,43 +130,141 @@ async def register_report(
         raise http_exception(message=f"Invalid report data: {e}",
                              status=status.HTTP_422_UNPROCESSABLE_ENTITY)
 
-    new_report = await report_service.create_report(report_data)
+    # Events are written to the outbox with the report and relayed to Kafka
+    new_report = await report_service.create_report(
+        report_data,
+        report_events(request, tenant_code, user_email, user, user_timezone_))
 
-    publish_message(
-        name="created_report_activity_history",
-        topic="report.report.created",
-        payload=send_payload(report_data, new_report.id, user_timezone_)
-    )
+    return {
+        "detail": "api072",
+        "new_report_id": new_report.id
+    }
 
-    try:
 
-        publish_message(
-            name="report_activity_history",
-            topic="report.user.activity.history",
-            payload=await send_activity_payload(
-                origin=[tenant_code],
-                request=request,
-                email=user_email,
-                first_name=user["first_name"],
-                last_name=user["last_name"],
-                action="create_report",
-                object_reference={
-                    "id": new_report.id,
-                    "report_type": new_report.type
-                }
-            )
-        )
-    except KeyError:
-        logging.info(
-            f"Failed to fetch user profile in report create. "
-            f"tenant_code : {tenant_code}")
+@router.post("/v1/{tenant_code}/reports/bulk",
+             responses=response_reports.get("bulk_register"))
+async def register_reports_bulk(
+        request: Request,
+        reports_data: ReportBulkCreate,
+        tenant_code: str = Path(
+            None,
+            title="Tenant code",
+            description="Code of the tenant from which will display records"),
+        tenant_claims: str = Header(None, alias=TENANT_CLAIMS_HEADER),
+        jwt_auth: CachedAuthJWT = Depends(),
+        session: AsyncSession = Depends(get_db_postgres),
+        async_client: ClientSession = Depends(aiohttp_client_session)
+):
+    """Register a batch of reports in a single transaction."""
+    jwt_auth.jwt_required()
+
+    tenant_id, user_email, user, user_timezone_ = await get_report_author(
+        tenant_code, tenant_claims, jwt_auth, async_client)
+
+    report_service = ReportService(session, tenant_id)
+
+    reports = []
+    for index, report_data in enumerate(reports_data.reports):
+        report_data = report_data.dict()
+        report_data["tenant_id"] = tenant_id
+        report_data["created_by"] = user_email
+
+        try:
+            Report(**report_data)
+
+        except Exception as e:
+            raise http_exception(message=f"Invalid report data at {index}: {e}",
+                                 status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+
+        reports.append(report_data)
+
+    # Events are written to the outbox with the reports and relayed to Kafka
+    new_reports = await report_service.create_reports(
+        reports,
+        report_events(request, tenant_code, user_email, user, user_timezone_))
 
     return {
         "detail": "api072",
-        "new_report_id": new_report.id
+        "new_report_ids": [new_report.id for new_report in new_reports]
     }
 
 
+async def get_report_author(tenant_code, tenant_claims, jwt_auth: CachedAuthJWT,
+                            async_client: ClientSession):
+    """Tenant id, email, profile and timezone of the user creating reports.
+
+    The tenant and the user profile are fetched concurrently under one
+    deadline, which is a 504 when exceeded.
+    """
+    decoded = jwt_auth.get_raw_jwt(jwt_auth.__dict__["_token"])
+    user_email = decoded.get("sub").split(":")[0]
+
+    try:
+        tenant, user = await gather_with_deadline(
+            get_tenant_session_info(
+                tenant_code=tenant_code,
+                jwt_token=jwt_auth.__dict__[
+                    "_token"],
+                client_session=async_client,
+                claims=decoded,
+                tenant_claims_token=tenant_claims
+            ),
+            get_user_profiles_by_email(
+                email=user_email,
+                tenant_code=tenant_code,
+                jwt_token=jwt_auth.__dict__[
+                    "_token"],
+                client_session=async_client
+            )
+        )
+    except asyncio.TimeoutError:
+        raise http_exception(message="Upstream services timed out",
+                             status=status.HTTP_504_GATEWAY_TIMEOUT)
+
+    user_timezone = user["timezone"] if user["timezone"] != "Default device" else "UTC"
+    user_timezone_ = user_timezone.replace("/", "@") if user_timezone.find(
+        "/") else user_timezone
+
+    return tenant["tenant_id"], user_email, user, user_timezone_
+
+
+def report_events(request, tenant_code, email, user, user_timezone):
+    """Outbox messages builder of the reports created by a user."""
+
+    async def build(report_data, new_report):
+        messages = [{
+            "name": "created_report_activity_history",
+            "topic": "report.report.created",
+            "payload": send_payload(report_data, new_report.id, user_timezone)
+        }]
+
+        try:
+            messages.append({
+                "name": "report_activity_history",
+                "topic": "report.user.activity.history",
+                "payload": await send_activity_payload(
+                    origin=[tenant_code],
+                    request=request,
+                    email=email,
+                    first_name=user["first_name"],
+                    last_name=user["last_name"],
+                    action="create_report",
+                    object_reference={
+                        "id": new_report.id,
+                        "report_type": new_report.type
+                    }
+                )
+            })
+        except KeyError:
+            logging.info(
+                f"Failed to fetch user profile in report create. "
+                f"tenant_code : {tenant_code}")
+
+        return messages
+
+    return build
+
+
 def send_payload(report, report_id, user_timezone):
     return {
         "report_id": report_id,
@@ -11,7 +11,9 @@ from domain.services import report_service
 from domain.services.report_service import ReportService
 from domain.services.rules_service import RuleService
 from domain.services.user_profiles_service import UserService
-from utils.common import get_db_postgres
+from domain.triggered_rules import get_fixed_intervals, \
+    get_triggered_rules_chart_series, get_triggered_rules_table
+from utils.common import get_db_postgres_reporting
 
 router = APIRouter(tags=["Report Service"])
 
@@ -24,7 +26,7 @@ async def report_registered_incidents(
         end_date: datetime,
         tenant_id: int,
         user_timezone: str,
-        db: AsyncSession = Depends(get_db_postgres)
+        db: AsyncSession = Depends(get_db_postgres_reporting)
 ):
     """Get Registered Incidents for Tenant based on period."""
 
@@ -52,6 +54,7 @@ async def report_registered_incidents(
         start_date=formatted_dates_and_timezone["start_date"],
         end_date=formatted_dates_and_timezone["end_date"],
         tenant_id=tenant_id,
+        user_timezone=formatted_dates_and_timezone["user_timezone"],
         db=db
     )
 
@@ -64,7 +67,8 @@ async def report_registered_incidents(
         res = defaultdict(list)
 
         for data in result_table:
-            res[data[2]].append((data[0], data[1], data[3]))
+            res[data["created_date"]].append(
+                (data["id"], data["name"], data["triggers"]))
 
         model_pattern["data"]['data_graphic'] = {
             "dates": [data[0] for data in result_graphic],
@@ -97,7 +101,7 @@ async def report_registered_events(
         start_date: datetime,
         end_date: datetime,
         user_timezone: str,
-        db: AsyncSession = Depends(get_db_postgres)
+        db: AsyncSession = Depends(get_db_postgres_reporting)
 ):
     """Get Registered Event Metrics for Tenant based on period."""
 
@@ -132,18 +136,18 @@ async def report_registered_events(
     if len(events) > 0:
         model_pattern['contains_data'] = True
 
-        events.sort(key=lambda x: x[0]["eps_date"].date(), reverse=False)
+        events.sort(key=lambda x: x["event"]["eps_date"].date(), reverse=False)
 
         model_pattern["data"]["eps_contracted"] = events[0]["eps_licensed"]
         model_pattern["data"]['table_metrics'] = {
-            "dates": [event[0]["eps_date"] for event in events],
-            "events": [event[0]["eps_total"] if event[0]["eps_total"] else 0 for
+            "dates": [event["event"]["eps_date"] for event in events],
+            "events": [event["event"]["eps_total"] if event["event"]["eps_total"] else 0 for
                        event in events],
-            "average_eps": [event[0]["eps_avg"] if event[0]["eps_avg"] else 0
+            "average_eps": [event["event"]["eps_avg"] if event["event"]["eps_avg"] else 0
                             for event in events],
-            "peak_eps": [event[0]["eps"] if event[0]["eps"] else 0 for event in
+            "peak_eps": [event["event"]["eps"] if event["event"]["eps"] else 0 for event in
                          events],
-            "peak_eps_moment": [event[0]["eps_date"] for event in events],
+            "peak_eps_moment": [event["event"]["eps_date"] for event in events],
         }
 
     await report_render(model_pattern, report_id)
@@ -165,7 +169,7 @@ async def report_top_10_rules(
         start_date: datetime,
         end_date: datetime,
         user_timezone: str,
-        db: AsyncSession = Depends(get_db_postgres)
+        db: AsyncSession = Depends(get_db_postgres_reporting)
 ):
     """Get Top 10 Rules with more alerts for Tenant based on period."""
 
@@ -191,17 +195,20 @@ async def report_top_10_rules(
         start_date=formatted_dates_and_timezone["start_date"],
         end_date=formatted_dates_and_timezone["end_date"],
         tenant_id=tenant_id,
+        user_timezone=formatted_dates_and_timezone["user_timezone"],
         db=db
     )
 
     model_pattern["data"]['table_rules'] = {
-        "general": [list(result) for result in top_10_rules['result_general']],
-        "match": [list(result) for result in top_10_rules['result_match']],
-        "threshold": [list(result) for result in
+        "general": [list(result.values()) for result in
+                    top_10_rules['result_general']],
+        "match": [list(result.values()) for result in
+                  top_10_rules['result_match']],
+        "threshold": [list(result.values()) for result in
                       top_10_rules['result_threshold']],
-        "correlated": [list(result) for result in
+        "correlated": [list(result.values()) for result in
                        top_10_rules['result_correlated']],
-        "_advanced": [list(result) for result in
+        "_advanced": [list(result.values()) for result in
                       top_10_rules['result_advanced']]
     }
 
@@ -216,3 +223,86 @@ async def report_top_10_rules(
                                              report_id)
         except IOError as e:
             logging.error(f"IOError writing to file: {e}")
+
+
+@router.get(
+    "/v1/triggered_rules/{tenant_id}/{report_id}/{start_date}/{end_date}/{user_timezone}")
+async def report_triggered_rules(
+        tenant_id: int,
+        report_id: int,
+        start_date: datetime,
+        end_date: datetime,
+        user_timezone: str,
+        db: AsyncSession = Depends(get_db_postgres_reporting)
+):
+    """Get Triggered Rules and their triggers for Tenant based on period."""
+
+    formatted_dates_and_timezone = ReportService.builds_and_formats_start_and_end_date(
+        start_date=start_date,
+        end_date=end_date,
+        user_timezone=user_timezone
+    )
+
+    model_pattern = {
+        "report_name": "Triggered Rules",
+        "report_template": "triggered_rules_report",
+        "generate_date": datetime.utcnow(),
+        "user_timezone": formatted_dates_and_timezone["user_timezone"],
+        "language": "en-US",
+        "utc": "0",
+        'contains_data': False,
+        "data": {
+            'start_date': formatted_dates_and_timezone["start_date"],
+            'end_date': formatted_dates_and_timezone["end_date"]
+        }
+    }
+
+    triggered_rules = await RuleService.get_triggered_rules(
+        start_date=formatted_dates_and_timezone["start_date"],
+        end_date=formatted_dates_and_timezone["end_date"],
+        tenant_id=tenant_id,
+        user_timezone=formatted_dates_and_timezone["user_timezone"],
+        db=db
+    )
+
+    if len(triggered_rules) > 0:
+        model_pattern['contains_data'] = True
+
+        gap = get_fixed_intervals(
+            formatted_dates_and_timezone["start_date"],
+            formatted_dates_and_timezone["end_date"])[0]
+
+        triggers = await RuleService.get_triggered_rules_series(
+            start_date=formatted_dates_and_timezone["start_date"],
+            end_date=formatted_dates_and_timezone["end_date"],
+            gap=gap,
+            tenant_id=tenant_id,
+            user_timezone=formatted_dates_and_timezone["user_timezone"],
+            db=db
+        )
+
+        labels, datasets = get_triggered_rules_chart_series(
+            start_date=formatted_dates_and_timezone["start_date"],
+            end_date=formatted_dates_and_timezone["end_date"],
+            hank=[rule["rule_data"] for rule in triggered_rules],
+            triggers=triggers
+        )
+
+        model_pattern["data"]['triggered_rules_chart'] = {
+            "labels": labels,
+            "datasets": datasets
+        }
+        model_pattern["data"]['table_rules'] = get_triggered_rules_table(
+            triggered_rules)
+
+    await report_render(model_pattern, report_id)
+
+    is_exist = os.path.exists(
+        f'./reports/report_triggered_rules_report_{report_id}.pdf')
+
+    if is_exist:
+        try:
+            await report_service.save_report(model_pattern["report_template"],
+                                             report_id)
+        except IOError as e:
+            logging.error(f"IOError writing to file: {e}")
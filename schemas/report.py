@@ -3,7 +3,10 @@
 from datetime import datetime
 from typing import List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, conlist
+
+# Largest number of reports created by a single bulk request
+REPORT_BULK_MAX_ITEMS = 500
 
 
 class ReportDownload(BaseModel):
@@ -27,6 +30,11 @@ class ReportCreate(BaseModel):
         orm_mode = True
 
 
+class ReportBulkCreate(BaseModel):
+    """Reports created together, in a single transaction."""
+    reports: conlist(ReportCreate, min_items=1, max_items=REPORT_BULK_MAX_ITEMS)
+
+
 class ReportOutput(BaseModel):
     id: int
     type: int
@@ -43,9 +51,11 @@ class ReportOutput(BaseModel):
 
 
 class PaginatedReportListOutput(BaseModel):
-    current_page: int
+    current_page: Optional[int]
     page_size: int
-    number_pages: int
-    count: int
+    number_pages: Optional[int]
+    count: Optional[int]
+    count_exact: bool
+    next_cursor: Optional[str]
     available_filters: Optional[dict[str, list]]
     records: List[ReportOutput]
@@ -0,0 +1,75 @@
+"""Microbenchmark of the report list serialization, without a database.
+
+Compares the response_model path (validation of the page by
+PaginatedReportListOutput, jsonable_encoder and JSONResponse) with the plain
+rows encoded by ORJSONResponse, as list_reports does:
+
+    python -m tests.benchmarks.list_serialization
+"""
+import json
+import os
+import timeit
+from datetime import datetime, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+from schemas.report import PaginatedReportListOutput
+
+PAGE_SIZES = [100, 1000]
+RUNS = int(os.environ.get("BENCHMARK_RUNS", 50))
+
+
+def _page(page_size: int) -> dict:
+    """A page of plain report rows, as returned by get_all_reports."""
+    created_at = datetime(2026, 1, 1, 8, 30)
+    return {
+        "current_page": 1,
+        "page_size": page_size,
+        "number_pages": 10,
+        "count": page_size * 10,
+        "count_exact": True,
+        "next_cursor": None,
+        "available_filters": {"type": [1, 2, 3], "status": [0, 1, 2]},
+        "records": [{
+            "id": number,
+            "type": number % 3 + 1,
+            "status": number % 3,
+            "name": f"Weekly report {number}",
+            "start_date": created_at - timedelta(days=7),
+            "end_date": created_at,
+            "created_by": "analyst@example.com",
+            "created_at": created_at + timedelta(seconds=number),
+            "updated_at": None,
+        } for number in range(page_size)]
+    }
+
+
+def response_model_body(page: dict) -> bytes:
+    content = jsonable_encoder(PaginatedReportListOutput.parse_obj(page))
+    return JSONResponse(content=content).body
+
+
+def orjson_body(page: dict) -> bytes:
+    return ORJSONResponse(content=page).body
+
+
+def main() -> None:
+    print(f"best of {RUNS} runs (ms)")
+    for page_size in PAGE_SIZES:
+        page = _page(page_size)
+        # Both paths must produce the same JSON
+        assert json.loads(response_model_body(page)) == \
+            json.loads(orjson_body(page))
+
+        timings = {
+            function.__name__: min(timeit.repeat(
+                lambda: function(page), number=1, repeat=RUNS)) * 1000
+            for function in (response_model_body, orjson_body)
+        }
+        print(f"page_size={page_size:<5} " + "  ".join(
+            f"{name}={timing:.2f}" for name, timing in timings.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+"""Shared test configuration."""
+import os
+
+# Settings read at import time by the models
+os.environ.setdefault("POSTGRES_SCHEMA", "report_interface")
@@ -0,0 +1,176 @@
+"""Tests of the in-process coroutine result cache."""
+import asyncio
+
+import pytest
+
+from utils import async_cache
+from utils.async_cache import AsyncTTLCache
+from utils.circuit_breaker import CircuitOpenError
+from utils.exceptions import NotFoundException
+
+
+class Clock:
+    """Monotonic clock moved by hand."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(async_cache.time, "monotonic", clock)
+    return clock
+
+
+class Loader:
+    """Loader counting its calls, returning the next value or error."""
+
+    def __init__(self, *results) -> None:
+        self.results = list(results)
+        self.calls = 0
+        self.release = None
+
+    async def __call__(self):
+        self.calls += 1
+        if self.release is not None:
+            await self.release.wait()
+        result = self.results.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+
+def test_concurrent_misses_share_one_load(clock):
+    cache = AsyncTTLCache("test", ttl=60)
+    loader = Loader("value")
+
+    async def scenario():
+        loader.release = asyncio.Event()
+        gets = asyncio.gather(*[cache.get("key", loader) for _ in range(5)])
+        await asyncio.sleep(0)
+        loader.release.set()
+        return await gets
+
+    assert asyncio.run(scenario()) == ["value"] * 5
+    assert loader.calls == 1
+
+
+def test_value_expires_after_the_ttl(clock):
+    cache = AsyncTTLCache("test", ttl=60)
+    loader = Loader("first", "second")
+
+    async def scenario():
+        first = await cache.get("key", loader)
+        clock.now += 59
+        cached = await cache.get("key", loader)
+        clock.now += 2
+        return first, cached, await cache.get("key", loader)
+
+    assert asyncio.run(scenario()) == ("first", "first", "second")
+    assert loader.calls == 2
+
+
+def test_stale_value_is_served_while_reloading(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_ttl=300)
+    loader = Loader("first", "second")
+
+    async def scenario():
+        await cache.get("key", loader)
+        clock.now += 120
+        stale = await cache.get("key", loader)
+        # Let the background reload finish
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        return stale, await cache.get("key", loader)
+
+    assert asyncio.run(scenario()) == ("first", "second")
+    assert loader.calls == 2
+
+
+def test_value_past_the_stale_ttl_is_loaded_again(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_ttl=300)
+    loader = Loader("first", "second")
+
+    async def scenario():
+        await cache.get("key", loader)
+        clock.now += 400
+        return await cache.get("key", loader)
+
+    assert asyncio.run(scenario()) == "second"
+
+
+def test_stale_value_is_served_on_listed_errors(clock):
+    cache = AsyncTTLCache("test", ttl=60, stale_on_errors=(CircuitOpenError,))
+    loader = Loader("first", CircuitOpenError("open"), RuntimeError("down"))
+
+    async def scenario():
+        await cache.get("key", loader)
+        clock.now += 120
+        stale = await cache.get("key", loader)
+        with pytest.raises(RuntimeError):
+            await cache.get("key", loader)
+        return stale
+
+    assert asyncio.run(scenario()) == "first"
+
+
+def test_negative_errors_are_cached(clock):
+    cache = AsyncTTLCache("test", ttl=60, negative_ttl=10,
+                          negative_errors=(NotFoundException,))
+    loader = Loader(NotFoundException(message="missing"), "found")
+
+    async def scenario():
+        for _ in range(2):
+            with pytest.raises(NotFoundException):
+                await cache.get("key", loader)
+        clock.now += 11
+        return await cache.get("key", loader)
+
+    assert asyncio.run(scenario()) == "found"
+    assert loader.calls == 2
+
+
+def test_other_errors_are_not_cached(clock):
+    cache = AsyncTTLCache("test", ttl=60)
+    loader = Loader(RuntimeError("down"), "value")
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await cache.get("key", loader)
+        return await cache.get("key", loader)
+
+    assert asyncio.run(scenario()) == "value"
+
+
+def test_cancelled_caller_does_not_cancel_the_shared_load(clock):
+    cache = AsyncTTLCache("test", ttl=60)
+    loader = Loader("value")
+
+    async def scenario():
+        loader.release = asyncio.Event()
+        first = asyncio.ensure_future(cache.get("key", loader))
+        second = asyncio.ensure_future(cache.get("key", loader))
+        await asyncio.sleep(0)
+        first.cancel()
+        loader.release.set()
+        return await second
+
+    assert asyncio.run(scenario()) == "value"
+    assert loader.calls == 1
+
+
+def test_least_recently_used_key_is_evicted(clock):
+    cache = AsyncTTLCache("test", ttl=60, max_size=2)
+
+    async def scenario():
+        for key in ["a", "b"]:
+            await cache.get(key, Loader(key))
+        await cache.get("a", Loader("unused"))
+        await cache.get("c", Loader("c"))
+
+    asyncio.run(scenario())
+    assert list(cache._entries) == ["a", "c"]
@@ -0,0 +1,100 @@
+"""Tests of the memoized JWT verification."""
+import pytest
+from fastapi_jwt_auth import AuthJWT
+from fastapi_jwt_auth.exceptions import AuthJWTException
+from pydantic import BaseModel
+from starlette.requests import Request
+
+from utils import auth_jwt
+from utils.auth_jwt import CachedAuthJWT
+
+
+class Settings(BaseModel):
+    authjwt_secret_key: str = "test-secret"
+
+
+@pytest.fixture(autouse=True)
+def verifications(monkeypatch):
+    AuthJWT.load_config(Settings)
+    CachedAuthJWT._verified_tokens.clear()
+
+    calls = []
+    verify = AuthJWT._verified_token
+
+    def counted(self, encoded_token, issuer=None):
+        calls.append(encoded_token)
+        return verify(self, encoded_token, issuer)
+
+    monkeypatch.setattr(AuthJWT, "_verified_token", counted)
+    yield calls
+    CachedAuthJWT._verified_tokens.clear()
+
+
+def authorize(token: str) -> dict:
+    request = Request({"type": "http", "headers": [
+        (b"authorization", f"Bearer {token}".encode())]})
+    jwt_auth = CachedAuthJWT(req=request)
+    jwt_auth.jwt_required()
+    return jwt_auth.get_raw_jwt()
+
+
+def test_token_is_verified_once(verifications):
+    token = AuthJWT().create_access_token(subject="ana@acme.com")
+
+    claims = [authorize(token) for _ in range(3)]
+
+    assert len(verifications) == 1
+    assert claims[0]["sub"] == claims[2]["sub"] == "ana@acme.com"
+
+
+def test_cached_claims_are_copies():
+    token = AuthJWT().create_access_token(subject="ana@acme.com")
+
+    authorize(token)["sub"] = "bob@acme.com"
+
+    assert authorize(token)["sub"] == "ana@acme.com"
+
+
+def test_expired_token_is_verified_again(verifications, monkeypatch):
+    token = AuthJWT().create_access_token(subject="ana@acme.com",
+                                          expires_time=60)
+    authorize(token)
+
+    (exp, _), = CachedAuthJWT._verified_tokens.values()
+    monkeypatch.setattr(auth_jwt.time, "time", lambda: exp + 1)
+    authorize(token)
+
+    assert len(verifications) > 1
+
+
+def test_token_without_expiry_is_not_cached(verifications):
+    token = AuthJWT().create_access_token(subject="ana@acme.com",
+                                          expires_time=False)
+
+    authorize(token)
+    first = len(verifications)
+    authorize(token)
+
+    assert len(verifications) == 2 * first
+    assert not CachedAuthJWT._verified_tokens
+
+
+def test_invalid_token_is_not_cached():
+    token = AuthJWT().create_access_token(subject="ana@acme.com")
+    forged = token[:-2] + ("AA" if not token.endswith("AA") else "BB")
+
+    for _ in range(2):
+        with pytest.raises(AuthJWTException):
+            authorize(forged)
+    assert not CachedAuthJWT._verified_tokens
+
+
+def test_least_recently_used_token_is_evicted(monkeypatch):
+    monkeypatch.setattr(auth_jwt, "VERIFIED_TOKEN_CACHE_SIZE", 2)
+    tokens = [AuthJWT().create_access_token(subject=f"user-{number}")
+              for number in range(3)]
+
+    for token in tokens:
+        authorize(token)
+
+    assert len(CachedAuthJWT._verified_tokens) == 2
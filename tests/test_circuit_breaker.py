@@ -0,0 +1,161 @@
+"""Tests of the circuit breaker and hedged requests."""
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, \
+    CircuitOpenError, hedged
+
+
+async def succeed():
+    return "ok"
+
+
+async def fail():
+    raise HTTPException(status_code=500)
+
+
+def make_breaker(**kwargs) -> CircuitBreaker:
+    settings = {"window": 4, "min_calls": 4, "failure_rate": 0.5,
+                "reset_timeout": 60}
+    settings.update(kwargs)
+    return CircuitBreaker("test", **settings)
+
+
+async def open_circuit(breaker: CircuitBreaker) -> None:
+    for _ in range(breaker.min_calls):
+        with pytest.raises(HTTPException):
+            await breaker.call(fail)
+
+
+def test_opens_on_failure_rate_and_rejects_calls():
+    async def scenario():
+        breaker = make_breaker()
+        await open_circuit(breaker)
+        assert breaker.state == OPEN
+
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+    asyncio.run(scenario())
+
+
+def test_client_errors_do_not_open_the_circuit():
+    async def not_found():
+        raise HTTPException(status_code=404)
+
+    async def scenario():
+        breaker = make_breaker()
+        for _ in range(breaker.min_calls):
+            with pytest.raises(HTTPException):
+                await breaker.call(not_found)
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_single_probe_closes_the_circuit():
+    async def scenario():
+        breaker = make_breaker(reset_timeout=0)
+        await open_circuit(breaker)
+
+        release = asyncio.Event()
+
+        async def probe():
+            await release.wait()
+            return "probe"
+
+        probe_task = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+        release.set()
+        assert await probe_task == "probe"
+        assert breaker.state == CLOSED
+
+    asyncio.run(scenario())
+
+
+def test_failed_probe_opens_the_circuit_again():
+    async def scenario():
+        breaker = make_breaker(reset_timeout=0)
+        await open_circuit(breaker)
+
+        with pytest.raises(HTTPException):
+            await breaker.call(fail)
+        assert breaker.state == OPEN
+
+    asyncio.run(scenario())
+
+
+def test_calls_started_before_opening_do_not_affect_the_probe():
+    async def scenario():
+        breaker = make_breaker(reset_timeout=0)
+        release_old = asyncio.Event()
+        release_probe = asyncio.Event()
+
+        async def old_call():
+            await release_old.wait()
+            return "old"
+
+        async def probe():
+            await release_probe.wait()
+            raise HTTPException(status_code=500)
+
+        old_task = asyncio.ensure_future(breaker.call(old_call))
+        await asyncio.sleep(0)
+        await open_circuit(breaker)
+
+        probe_task = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        assert breaker.state == HALF_OPEN
+
+        # The old call finishes during the probe: it must neither close the
+        # circuit nor let a second probe in.
+        release_old.set()
+        assert await old_task == "old"
+        assert breaker.state == HALF_OPEN
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(succeed)
+
+        release_probe.set()
+        with pytest.raises(HTTPException):
+            await probe_task
+        assert breaker.state == OPEN
+
+    asyncio.run(scenario())
+
+
+def test_hedged_returns_the_first_success():
+    async def scenario():
+        attempts = []
+
+        async def factory():
+            attempts.append(len(attempts))
+            if len(attempts) == 1:
+                await asyncio.sleep(10)
+                return "slow"
+            return "fast"
+
+        assert await asyncio.wait_for(hedged(factory, 0.01), 1) == "fast"
+        assert len(attempts) == 2
+
+    asyncio.run(scenario())
+
+
+def test_hedged_does_not_hedge_fast_calls():
+    async def scenario():
+        attempts = []
+
+        async def factory():
+            attempts.append(1)
+            return "fast"
+
+        assert await hedged(factory, 1) == "fast"
+        assert len(attempts) == 1
+
+    asyncio.run(scenario())
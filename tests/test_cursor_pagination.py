@@ -0,0 +1,98 @@
+"""Tests of the keyset pagination cursors."""
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.report import Report, ReportDTO
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(),
+                              compile_kwargs={"literal_binds": True}))
+
+
+@pytest.fixture
+def report_dto() -> ReportDTO:
+    return ReportDTO(None, 1)
+
+
+def test_sort_keys_end_with_the_primary_key(report_dto):
+    sort_keys = report_dto._get_sort_keys(["created_at:DESC"])
+
+    assert [(column.key, descending) for column, descending in sort_keys] == \
+        [("created_at", True), ("id", False)]
+
+
+def test_cursor_round_trip(report_dto):
+    sort_keys = report_dto._get_sort_keys(["created_at:DESC", "name:ASC"])
+    record = Report(id=7, name="weekly", created_at=datetime(2026, 3, 1, 12, 30))
+
+    cursor = report_dto._encode_cursor(record, sort_keys)
+
+    assert report_dto._decode_cursor(cursor, sort_keys) == \
+        [datetime(2026, 3, 1, 12, 30), "weekly", 7]
+
+
+def test_cursor_keeps_null_values(report_dto):
+    sort_keys = report_dto._get_sort_keys(["name:ASC"])
+    record = Report(id=7, name=None)
+
+    cursor = report_dto._encode_cursor(record, sort_keys)
+
+    assert report_dto._decode_cursor(cursor, sort_keys) == [None, 7]
+
+
+@pytest.mark.parametrize("values", [
+    [1, 7],               # not an ISO datetime for created_at
+    ["2026-03-01", "7"],  # a string for the integer id
+    ["2026-03-01", True],  # a bool for the integer id
+    ["yesterday", 7],     # not an ISO datetime
+    ["2026-03-01"],       # does not match the sort order
+])
+def test_invalid_cursor_values_raise_value_error(report_dto, values):
+    sort_keys = report_dto._get_sort_keys(["created_at:ASC"])
+    record = Report(id=values[-1], created_at=values[0])
+    cursor = report_dto._encode_cursor(record, sort_keys[:len(values)])
+
+    with pytest.raises(ValueError):
+        report_dto._decode_cursor(cursor, sort_keys)
+
+
+def test_malformed_cursor_raises_value_error(report_dto):
+    with pytest.raises(ValueError):
+        report_dto._decode_cursor("not a cursor", report_dto._get_sort_keys([]))
+
+
+def test_seek_predicate_on_the_primary_key(report_dto):
+    sort_keys = report_dto._get_sort_keys([])
+
+    assert compile_sql(report_dto._get_seek_predicate(sort_keys, [7])) == \
+        "report_interface.report.id > 7"
+
+
+def test_seek_predicate_on_a_descending_key(report_dto):
+    sort_keys = report_dto._get_sort_keys(["created_at:DESC"])
+    predicate = report_dto._get_seek_predicate(
+        sort_keys, [datetime(2026, 3, 1), 7]).compile(dialect=postgresql.dialect())
+
+    assert str(predicate) == (
+        "report_interface.report.created_at < %(created_at_1)s OR "
+        "report_interface.report.created_at = %(created_at_2)s AND "
+        "report_interface.report.id > %(id_1)s")
+    assert predicate.params == {"created_at_1": datetime(2026, 3, 1),
+                                "created_at_2": datetime(2026, 3, 1),
+                                "id_1": 7}
+
+
+def test_seek_predicate_after_nulls(report_dto):
+    # NULLs sort last ascending: after a NULL only the next ids follow
+    ascending = report_dto._get_sort_keys(["name:ASC"])
+    assert compile_sql(report_dto._get_seek_predicate(ascending, [None, 7])) == \
+        "report_interface.report.name IS NULL AND report_interface.report.id > 7"
+
+    # and first descending: every non NULL value follows
+    descending = report_dto._get_sort_keys(["name:DESC"])
+    assert compile_sql(report_dto._get_seek_predicate(descending, [None, 7])) == (
+        "report_interface.report.name IS NOT NULL OR "
+        "report_interface.report.name IS NULL AND report_interface.report.id > 7")
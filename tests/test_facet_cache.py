@@ -0,0 +1,134 @@
+"""Tests of the cached filter values."""
+import asyncio
+
+import aioredis
+import pytest
+
+from utils.cache import FacetCache, RedisCache
+
+
+class FakePipeline:
+    """Pipeline of FakeRedis: commands are queued until execute(), except
+    between watch() and multi(), where they run right away."""
+
+    def __init__(self, redis) -> None:
+        self.redis = redis
+        self.commands = []
+        self.watched = {}
+        self.immediate = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        pass
+
+    async def watch(self, *keys):
+        self.watched = {key: self.redis.versions.get(key, 0) for key in keys}
+        self.immediate = True
+
+    def multi(self):
+        self.immediate = False
+
+    def __getattr__(self, name):
+        command = getattr(self.redis, name)
+        if self.immediate:
+            return command
+
+        def queue(*args, **kwargs):
+            self.commands.append((command, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        if any(self.redis.versions.get(key, 0) != version
+               for key, version in self.watched.items()):
+            raise aioredis.WatchError("Watched variable changed.")
+        return [await command(*args, **kwargs)
+                for command, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """In-memory stand-in of the few Redis commands used by FacetCache."""
+
+    def __init__(self) -> None:
+        self.values = {}
+        self.versions = {}
+
+    def _write(self, key, value) -> None:
+        self.versions[key] = self.versions.get(key, 0) + 1
+        if value is None:
+            self.values.pop(key, None)
+        else:
+            self.values[key] = value
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    async def get(self, key):
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        self._write(key, str(value).encode())
+
+    async def incr(self, key):
+        self._write(key, str(int(self.values.get(key, 0)) + 1).encode())
+        return int(self.values[key])
+
+    async def expire(self, key, seconds):
+        return key in self.values
+
+    async def exists(self, *keys):
+        return sum(key in self.values for key in keys)
+
+    async def delete(self, *keys):
+        for key in keys:
+            self._write(key, None)
+
+    async def sadd(self, key, *members):
+        self._write(key, self.values.get(key, set()) | set(members))
+
+    async def smembers(self, key):
+        return self.values.get(key, set())
+
+
+@pytest.fixture
+def cache():
+    RedisCache.redis = FakeRedis()
+    yield FacetCache("report")
+    RedisCache.redis = None
+
+
+def test_loaded_scope_is_read_back(cache):
+    async def scenario():
+        await cache.set(1, {"type": [2, 1], "created_by": [None, "ana"]},
+                        await cache.generation(1))
+        return await cache.get(1, ["type", "created_by"])
+
+    assert asyncio.run(scenario()) == {"type": [1, 2],
+                                       "created_by": ["ana", None]}
+
+
+def test_add_updates_loaded_scopes_only(cache):
+    async def scenario():
+        await cache.add(1, {"type": 3})
+        unloaded = await cache.get(1, ["type"])
+
+        await cache.set(1, {"type": [1]}, await cache.generation(1))
+        await cache.add(1, {"type": 3})
+        return unloaded, await cache.get(1, ["type"])
+
+    assert asyncio.run(scenario()) == (None, {"type": [1, 3]})
+
+
+def test_values_added_during_a_load_are_not_overwritten(cache):
+    async def scenario():
+        generation = await cache.generation(1)
+        # DISTINCT read before the new report; it is created meanwhile
+        facets = {"type": [1]}
+        await cache.add(1, {"type": 3})
+        await cache.set(1, facets, generation)
+        return await cache.get(1, ["type"])
+
+    # The stale read is dropped, the next miss loads the scope again
+    assert asyncio.run(scenario()) is None
@@ -0,0 +1,38 @@
+"""Tests of the list filters."""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from models.abstract import _escape_like
+from models.report import Report, ReportDTO
+
+
+def compile_sql(clause) -> str:
+    return str(clause.compile(dialect=postgresql.dialect(),
+                              compile_kwargs={"literal_binds": True}))
+
+
+@pytest.mark.parametrize("value, escaped", [
+    ("weekly", "weekly"),
+    ("100%", "100\\%"),
+    ("daily_report", "daily\\_report"),
+    ("C:\\reports", "C:\\\\reports"),
+    ("\\%_", "\\\\\\%\\_"),
+])
+def test_escape_like(value, escaped):
+    assert _escape_like(value) == escaped
+
+
+def test_string_filter_matches_wildcards_literally():
+    statement = ReportDTO._get_filter_statement(Report.name, "100%,a_b")
+
+    compiled = statement.compile(dialect=postgresql.dialect())
+
+    assert str(compiled).count("ILIKE") == 2
+    assert sorted(compiled.params.values()) == ["%100\\%%", "%a\\_b%"]
+
+
+def test_string_filter_is_not_cast():
+    # A CAST around the column would keep the trigram index from being used
+    statement = ReportDTO._get_filter_statement(Report.created_by, "ana")
+
+    assert "CAST" not in compile_sql(statement)
@@ -0,0 +1,75 @@
+"""Tests of the concurrent upstream calls under a shared deadline."""
+import asyncio
+
+import pytest
+
+from utils.common import gather_with_deadline
+
+
+class Call:
+    """Upstream call answering after a delay, remembering its cancellation."""
+
+    def __init__(self, delay: float, result=None, error: Exception = None):
+        self.delay = delay
+        self.result = result
+        self.error = error
+        self.cancelled = False
+
+    async def __call__(self):
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+def test_results_keep_the_call_order():
+    async def scenario():
+        return await gather_with_deadline(Call(0.02, "tenant")(),
+                                          Call(0.01, "profile")(), timeout=1)
+
+    assert asyncio.run(scenario()) == ["tenant", "profile"]
+
+
+def test_first_failure_cancels_the_other_calls():
+    slow = Call(1, "tenant")
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await gather_with_deadline(
+                slow(), Call(0.01, error=ValueError("profile"))(), timeout=5)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert slow.cancelled
+
+
+def test_deadline_cancels_the_pending_calls():
+    slow = Call(1, "tenant")
+
+    async def scenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await gather_with_deadline(slow(), Call(0, "profile")(),
+                                       timeout=0.02)
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert slow.cancelled
+
+
+def test_cancelled_caller_cancels_the_calls():
+    slow = Call(1, "tenant")
+
+    async def scenario():
+        gather = asyncio.ensure_future(gather_with_deadline(slow(), timeout=5))
+        await asyncio.sleep(0.01)
+        gather.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await gather
+        await asyncio.sleep(0)
+
+    asyncio.run(scenario())
+    assert slow.cancelled
@@ -0,0 +1,109 @@
+"""Tests of the report query cache."""
+import asyncio
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.cache import RedisCache, cached_query
+
+
+class FakeRedis:
+    """In-memory stand-in of the few Redis commands used by the cache."""
+
+    def __init__(self, error: Exception = None) -> None:
+        self.values = {}
+        self.error = error
+
+    async def get(self, key):
+        if self.error is not None:
+            raise self.error
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.error is not None:
+            raise self.error
+        self.values[key] = value
+
+
+def query_rows():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        return connection.execute(text(
+            "select 1 as id, 'weekly' as name, 2.5 as hits")).fetchall()
+
+
+@pytest.fixture
+def calls():
+    return []
+
+
+@pytest.fixture
+def report_query(calls):
+    @cached_query("test_rows")
+    async def get_rows(start_date: datetime, end_date: datetime,
+                       tenant_id: int, db=None):
+        calls.append(tenant_id)
+        return {"rows": query_rows(),
+                "totals": [[datetime(2026, 1, 1), Decimal("1.5")]]}
+
+    return get_rows
+
+
+@pytest.fixture(autouse=True)
+def reset_redis():
+    yield
+    RedisCache.redis = None
+
+
+EXPECTED = {"rows": [{"id": 1, "name": "weekly", "hits": 2.5}],
+            "totals": [[datetime(2026, 1, 1), Decimal("1.5")]]}
+
+
+def run_query(report_query):
+    return asyncio.run(report_query(start_date=datetime(2026, 1, 1),
+                                    end_date=datetime(2026, 1, 31),
+                                    tenant_id=1))
+
+
+def test_hits_and_misses_return_the_same_shape(report_query, calls):
+    RedisCache.redis = FakeRedis()
+
+    miss = run_query(report_query)
+    hit = run_query(report_query)
+
+    assert miss == hit == EXPECTED
+    assert calls == [1]
+
+
+def test_bypass_returns_plain_rows(report_query, calls):
+    assert run_query(report_query) == EXPECTED
+    assert calls == [1]
+
+
+def test_redis_timeouts_are_misses(report_query, calls):
+    RedisCache.redis = FakeRedis(error=asyncio.TimeoutError())
+
+    assert run_query(report_query) == EXPECTED
+    assert run_query(report_query) == EXPECTED
+    assert calls == [1, 1]
+
+
+def test_new_query_version_misses_the_old_entries(calls):
+    RedisCache.redis = FakeRedis()
+
+    def query(version):
+        @cached_query("test_rows", version=version)
+        async def get_rows(start_date: datetime, end_date: datetime,
+                           tenant_id: int, db=None):
+            calls.append(version)
+            return query_rows()
+
+        return get_rows
+
+    for version in [1, 1, 2]:
+        run_query(query(version))
+
+    assert calls == [1, 2]
+    assert len(RedisCache.redis.values) == 2
@@ -0,0 +1,143 @@
+"""Tests of the named report queries."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from db import query_catalog
+from db.query_catalog import QueryCatalog, report_queries
+from domain.services.rules_service import RuleService, \
+    TRIGGERED_RULES_BUCKETS
+from domain.services.user_profiles_service import UserService
+
+START_DATE = datetime(2026, 3, 1)
+END_DATE = datetime(2026, 3, 31, 23, 59, 59)
+
+
+class FakeResult:
+
+    def __init__(self, value=None) -> None:
+        self.value = value
+
+    def fetchall(self):
+        return []
+
+    def scalar_one(self):
+        return self.value
+
+    async def partitions(self, size):
+        for rows in [[1, 2], [3]]:
+            yield rows
+
+
+class FakeSession:
+    """Session answering EXPLAIN with a plan and the queries with rows."""
+
+    def __init__(self) -> None:
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+        if str(statement).startswith("EXPLAIN"):
+            return FakeResult('[{"Plan": {}, "Planning Time": 1.5}]')
+        return FakeResult()
+
+    async def stream(self, statement, params=None):
+        self.statements.append(str(statement))
+        return FakeResult()
+
+
+@pytest.fixture
+def observed(monkeypatch):
+    observed = []
+    monkeypatch.setattr(query_catalog.metrics, "observe",
+                        lambda name, value, **labels: observed.append(
+                            (name, value, labels)))
+    return observed
+
+
+@pytest.fixture
+def query_calls(monkeypatch):
+    """(name, params) of every catalog query run by the report services."""
+    calls = []
+
+    async def execute(db, name, params=None):
+        calls.append((name, params))
+        return FakeResult()
+
+    async def stream(db, name, params=None, chunk_size=1000):
+        calls.append((name, params))
+        for row in []:
+            yield row
+
+    monkeypatch.setattr(report_queries, "execute", execute)
+    monkeypatch.setattr(report_queries, "stream", stream)
+
+    async def run_services():
+        dates = {"start_date": START_DATE, "end_date": END_DATE,
+                 "tenant_id": 1, "db": None}
+        await RuleService.get_alerts_and_rules(**dates, user_timezone="UTC")
+        await RuleService.get_top_10_rules(**dates, user_timezone="UTC")
+        await RuleService.get_triggered_rules(**dates, user_timezone="UTC")
+        for gap in TRIGGERED_RULES_BUCKETS:
+            await RuleService.get_triggered_rules_series(
+                **dates, gap=gap, user_timezone="UTC")
+        await UserService.get_events_by_time_interval_and_tenant_id(**dates)
+
+    asyncio.run(run_services())
+    return calls
+
+
+def bind_names(name: str) -> set:
+    compiled = report_queries.get(name).compile(dialect=postgresql.dialect())
+    return set(compiled.params)
+
+
+def test_every_query_is_run_by_a_service(query_calls):
+    assert {name for name, _ in query_calls} == set(report_queries.names)
+
+
+def test_services_pass_the_query_parameters(query_calls):
+    for name, params in query_calls:
+        assert set(params) == bind_names(name), name
+
+
+def test_planning_time_of_sampled_runs(observed):
+    catalog = QueryCatalog(plan_sample_rate=1)
+    catalog.register("count", "select count(*) from report")
+    session = FakeSession()
+
+    asyncio.run(catalog.execute(session, "count"))
+
+    assert session.statements == [
+        "EXPLAIN (SUMMARY, FORMAT JSON) select count(*) from report",
+        "select count(*) from report"]
+    assert [(name, value) for name, value, _ in observed] == [
+        ("query_planning_seconds", 0.0015),
+        ("query_execute_seconds", observed[1][1])]
+
+
+def test_runs_out_of_the_sample_are_not_explained(observed):
+    catalog = QueryCatalog(plan_sample_rate=0)
+    catalog.register("count", "select count(*) from report")
+    session = FakeSession()
+
+    asyncio.run(catalog.execute(session, "count"))
+
+    assert session.statements == ["select count(*) from report"]
+    assert [name for name, _, _ in observed] == ["query_execute_seconds"]
+
+
+def test_stream_closed_early_is_timed(observed):
+    catalog = QueryCatalog(plan_sample_rate=0)
+    catalog.register("rows", "select id from report")
+
+    async def first_row():
+        rows = catalog.stream(FakeSession(), "rows")
+        async for row in rows:
+            await rows.aclose()
+            return row
+
+    assert asyncio.run(first_row()) == 1
+    assert [name for name, _, _ in observed] == ["query_execute_seconds"]
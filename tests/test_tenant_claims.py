@@ -0,0 +1,81 @@
+"""Tests of the tenant authorization from token claims."""
+import time
+
+import jwt
+import pytest
+
+from domain import get_session_info
+from domain.get_session_info import get_tenant_from_claims
+
+SECRET = "tenant-claims-secret"
+
+
+@pytest.fixture(autouse=True)
+def claims_secret(monkeypatch):
+    monkeypatch.setattr(get_session_info, "TENANT_CLAIMS_SECRET", SECRET)
+
+
+def access_claims(**claims) -> dict:
+    return {"sub": "ana@acme.com", "iat": int(time.time()), **claims}
+
+
+def claims_token(secret: str = SECRET, **claims) -> str:
+    return jwt.encode(access_claims(**claims), secret,
+                      algorithm="HS256").decode("utf-8")
+
+
+def test_tenant_from_the_access_token():
+    claims = access_claims(tenants={"acme": 7})
+
+    assert get_tenant_from_claims("acme", claims) == \
+        {"tenant_id": 7, "code": "acme"}
+
+
+@pytest.mark.parametrize("claims", [
+    None,
+    access_claims(),
+    access_claims(tenants={"other": 8}),
+    access_claims(tenants=["acme"]),
+    access_claims(tenants={"acme": 7}, iat=int(time.time()) - 3600),
+    access_claims(tenants={"acme": 7}, iat=None),
+    access_claims(tenants={"acme": 7}, iat="yesterday"),
+])
+def test_missing_or_stale_memberships_fall_back(claims):
+    assert get_tenant_from_claims("acme", claims) is None
+
+
+@pytest.mark.parametrize("tenant_id", ["7", 7.0, True, None, {"id": 7}])
+def test_tenant_id_that_is_not_an_integer_falls_back(tenant_id):
+    claims = access_claims(tenants={"acme": tenant_id})
+
+    assert get_tenant_from_claims("acme", claims) is None
+
+
+def test_tenant_from_the_claims_token():
+    token = claims_token(tenants={"acme": 7})
+
+    assert get_tenant_from_claims("acme", access_claims(), token) == \
+        {"tenant_id": 7, "code": "acme"}
+
+
+def test_access_token_memberships_come_first():
+    token = claims_token(tenants={"acme": 8})
+
+    assert get_tenant_from_claims(
+        "acme", access_claims(tenants={"acme": 7}), token)["tenant_id"] == 7
+
+
+@pytest.mark.parametrize("token", [
+    claims_token(secret="another-secret", tenants={"acme": 7}),
+    claims_token(tenants={"acme": 7}, sub="bob@acme.com"),
+    "not-a-token",
+])
+def test_untrusted_claims_token_falls_back(token):
+    assert get_tenant_from_claims("acme", access_claims(), token) is None
+
+
+def test_claims_token_is_ignored_without_a_key(monkeypatch):
+    monkeypatch.setattr(get_session_info, "TENANT_CLAIMS_SECRET", "")
+
+    assert get_tenant_from_claims(
+        "acme", access_claims(), claims_token(tenants={"acme": 7})) is None
@@ -0,0 +1,215 @@
+"""Tests of the triggered rules time buckets."""
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from domain.services.rules_service import TRIGGERED_RULES_BUCKETS
+from domain.triggered_rules import get_fixed_intervals, \
+    get_triggered_rules_chart_series, get_triggered_rules_table
+from domain.utils.time_buckets import aggregate_by_key, get_bucket_index, \
+    get_interval_bins
+
+
+# Ranges of each gap, with end dates inside their last day or period
+REPORT_RANGES = [
+    (datetime(2026, 3, 5, 8), datetime(2026, 3, 5, 20, 30)),
+    (datetime(2026, 3, 5), datetime(2026, 3, 5, 23, 59, 59)),
+    (datetime(2026, 3, 5, 10), datetime(2026, 3, 7, 15, 30)),
+    (datetime(2026, 3, 5), datetime(2026, 4, 20, 23, 59, 59)),
+    (datetime(2026, 1, 15, 9), datetime(2026, 6, 20, 15)),
+    (datetime(2023, 3, 1), datetime(2026, 2, 1, 12)),
+]
+
+
+def as_datetimes(values: np.ndarray) -> list:
+    return values.astype(datetime).tolist()
+
+
+def series_interval_start(timestamp: datetime, gap: str) -> datetime:
+    """interval_start of a trigger, as the triggered_rules_series query
+    computes it."""
+    bucket = TRIGGERED_RULES_BUCKETS[gap]
+    midnight = timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket["unit"] == "hour":
+        step = bucket["step_hours"]
+        return midnight + timedelta(hours=timestamp.hour // step * step)
+    if bucket["unit"] == "day":
+        return midnight
+    if bucket["unit"] == "month":
+        return midnight.replace(day=1)
+    return midnight.replace(month=1, day=1)
+
+
+def trigger_dates(start_date: datetime, end_date: datetime,
+                  number: int) -> list:
+    """Trigger dates spread over the range, its bounds included."""
+    seconds = np.random.default_rng(7).integers(
+        0, (end_date - start_date).total_seconds(), number, endpoint=True)
+    return [start_date, end_date] + \
+        [start_date + timedelta(seconds=int(second)) for second in seconds]
+
+
+@pytest.mark.parametrize("start_date, end_date, gap, format_date", [
+    (datetime(2026, 3, 5), datetime(2026, 3, 5, 23, 59), "1H", "%H:%M"),
+    (datetime(2026, 3, 5), datetime(2026, 3, 7), "6H", "%m/%d %H:%M"),
+    (datetime(2026, 3, 5), datetime(2026, 6, 3), "1d", "%d/%m"),
+    (datetime(2025, 6, 1), datetime(2026, 6, 1), "1M", "%B"),
+    (datetime(2023, 3, 1), datetime(2026, 2, 1), "1Y", "%Y"),
+])
+def test_fixed_intervals_gap(start_date, end_date, gap, format_date):
+    assert get_fixed_intervals(start_date, end_date)[:2] == (gap, format_date)
+
+
+def test_hourly_single_day_covers_the_whole_day():
+    labels, edges = get_interval_bins(datetime(2026, 3, 5, 8),
+                                      datetime(2026, 3, 5, 20), "1H")
+
+    assert as_datetimes(labels) == [datetime(2026, 3, 5, hour)
+                                    for hour in range(24)]
+    assert as_datetimes(edges[-1:]) == [datetime(2026, 3, 6)]
+
+
+def test_six_hours_cover_the_last_day():
+    labels, edges = get_interval_bins(datetime(2026, 3, 5),
+                                      datetime(2026, 3, 7, 12), "6H")
+
+    assert len(labels) == 12
+    assert as_datetimes(labels[[0, -1]]) == [datetime(2026, 3, 5),
+                                             datetime(2026, 3, 7, 18)]
+    assert as_datetimes(edges[-1:]) == [datetime(2026, 3, 8)]
+
+
+def test_months_are_labelled_by_their_last_day():
+    labels, edges = get_interval_bins(datetime(2026, 1, 15),
+                                      datetime(2026, 5, 31), "1M")
+
+    assert as_datetimes(labels) == [
+        datetime(2026, 1, 31), datetime(2026, 2, 28), datetime(2026, 3, 31),
+        datetime(2026, 4, 30), datetime(2026, 5, 31)]
+    assert as_datetimes(edges) == [
+        datetime(2026, 1, 1), datetime(2026, 2, 1), datetime(2026, 3, 1),
+        datetime(2026, 4, 1), datetime(2026, 5, 1), datetime(2026, 6, 1)]
+
+
+def test_partial_last_month_is_kept():
+    labels, edges = get_interval_bins(datetime(2026, 1, 15),
+                                      datetime(2026, 6, 20), "1M")
+
+    assert as_datetimes(labels[-2:]) == [datetime(2026, 5, 31),
+                                         datetime(2026, 6, 30)]
+    assert as_datetimes(edges[-1:]) == [datetime(2026, 7, 1)]
+    assert get_bucket_index([datetime(2026, 5, 31, 23, 59),
+                             datetime(2026, 6, 20)], edges).tolist() == [4, 5]
+
+
+def test_years_are_labelled_by_their_last_day():
+    labels, edges = get_interval_bins(datetime(2023, 3, 1),
+                                      datetime(2026, 2, 1), "1Y")
+
+    # 2026 is not over on the end date, but is kept
+    assert as_datetimes(labels) == [datetime(2023, 12, 31),
+                                    datetime(2024, 12, 31),
+                                    datetime(2025, 12, 31),
+                                    datetime(2026, 12, 31)]
+    assert as_datetimes(edges) == [datetime(2023, 1, 1), datetime(2024, 1, 1),
+                                   datetime(2025, 1, 1), datetime(2026, 1, 1),
+                                   datetime(2027, 1, 1)]
+
+
+def test_bucket_index():
+    _, edges = get_interval_bins(datetime(2026, 3, 5), datetime(2026, 3, 6),
+                                 "6H")
+
+    index = get_bucket_index([
+        datetime(2026, 3, 4, 23, 59),
+        datetime(2026, 3, 5),
+        datetime(2026, 3, 5, 5, 59, 59),
+        datetime(2026, 3, 5, 6, tzinfo=timezone.utc),
+        datetime(2026, 3, 6, 5, 59),
+        datetime(2026, 3, 6, 23, 59, 59),
+        datetime(2026, 3, 7),
+    ], edges)
+
+    assert index.tolist() == [-1, 0, 0, 1, 4, 7, -1]
+
+
+def test_aggregate_by_key_ignores_rows_outside_the_buckets():
+    totals = aggregate_by_key(
+        keys=np.array([0, 1, 0, 1, 0]),
+        buckets=np.array([0, 2, 0, -1, 1]),
+        values=np.array([2, 3, 5, 7, 11], dtype=float),
+        number_keys=2,
+        number_buckets=3
+    )
+
+    assert totals.dtype == np.int64
+    assert totals.tolist() == [[7, 11, 0], [0, 0, 3]]
+
+
+def test_chart_series_follow_the_hank_order():
+    triggers = [
+        {"interval_start": datetime(2026, 3, 5), "triggers": 2, "rule_data": "b"},
+        {"interval_start": datetime(2026, 3, 6), "triggers": 3, "rule_data": "a"},
+        {"interval_start": datetime(2026, 3, 6), "triggers": 4, "rule_data": "b"},
+    ]
+
+    labels, datasets = get_triggered_rules_chart_series(
+        datetime(2026, 3, 5), datetime(2026, 3, 9), hank=["b", "a"],
+        triggers=triggers)
+
+    assert labels == ["05/03", "06/03", "07/03", "08/03", "09/03"]
+    assert [(dataset["label"], dataset["data"]) for dataset in datasets] == \
+        [("b", [2, 4, 0, 0, 0]), ("a", [0, 3, 0, 0, 0])]
+
+
+def test_chart_series_group_the_other_rules():
+    hank = [f"rule-{number:02}" for number in range(12)]
+    triggers = [{"interval_start": datetime(2026, 3, 5), "triggers": 1,
+                 "rule_data": rule} for rule in hank]
+
+    _, datasets = get_triggered_rules_chart_series(
+        datetime(2026, 3, 5), datetime(2026, 3, 5, 23), hank=hank,
+        triggers=triggers)
+
+    assert [dataset["label"] for dataset in datasets] == hank[:10] + ["Others"]
+    assert datasets[-1]["data"] == [2] + [0] * 23
+
+
+@pytest.mark.parametrize("start_date, end_date", REPORT_RANGES)
+def test_every_series_row_falls_in_a_bucket(start_date, end_date):
+    gap, _, _, edges = get_fixed_intervals(start_date, end_date)
+
+    interval_starts = [series_interval_start(date, gap)
+                       for date in trigger_dates(start_date, end_date, 2000)]
+    index = get_bucket_index(interval_starts, edges)
+
+    assert (index >= 0).all()
+    # The SQL buckets start on the bin edges
+    assert as_datetimes(edges[index]) == interval_starts
+
+
+@pytest.mark.parametrize("start_date, end_date", [
+    REPORT_RANGES[0], REPORT_RANGES[2], REPORT_RANGES[4]])
+def test_chart_totals_match_the_table(start_date, end_date):
+    gap = get_fixed_intervals(start_date, end_date)[0]
+    dates = trigger_dates(start_date, end_date, 500)
+    rules = [f"{number % 4}-rule" for number in range(len(dates))]
+
+    # Rows of the triggered_rules and triggered_rules_series queries
+    table = get_triggered_rules_table([
+        {"id": rule, "name": rule, "triggers": triggers, "hits": triggers,
+         "severity": "Low", "source": 0}
+        for rule, triggers in Counter(rules).most_common()])
+    series = Counter((series_interval_start(date, gap), rule)
+                     for date, rule in zip(dates, rules))
+
+    _, datasets = get_triggered_rules_chart_series(
+        start_date, end_date, hank=[rule["id"] for rule in table],
+        triggers=[{"interval_start": interval_start, "rule_data": rule,
+                   "triggers": triggers}
+                  for (interval_start, rule), triggers in series.items()])
+
+    assert {dataset["label"]: sum(dataset["data"]) for dataset in datasets} \
+        == {rule["id"]: rule["triggers"] for rule in table}
@@ -0,0 +1,135 @@
+"""Tests of the user profile change events."""
+import asyncio
+import logging
+from types import SimpleNamespace
+
+import pytest
+from kafka.errors import KafkaConnectionError, KafkaError
+
+from domain import kafka_consumer
+from domain.get_user_profiles import invalidate_user_profile, \
+    user_profile_cache
+from domain.kafka_consumer import EventListener
+
+
+@pytest.fixture
+def cached_profiles():
+    async def load(key):
+        return await user_profile_cache.get(key, lambda: asyncio.sleep(0, key))
+
+    async def fill():
+        for key in [("acme", "ana@acme.com"), ("acme", "bob@acme.com"),
+                    ("other", "ana@acme.com")]:
+            await load(key)
+
+    user_profile_cache.clear()
+    asyncio.run(fill())
+    yield user_profile_cache._entries
+    user_profile_cache.clear()
+
+
+def test_event_drops_the_profiles_of_the_email(cached_profiles):
+    invalidate_user_profile({"payload": {"email": "ana@acme.com"}})
+
+    assert list(cached_profiles) == [("acme", "bob@acme.com")]
+
+
+@pytest.mark.parametrize("message", [{}, {"payload": None},
+                                     {"payload": "ana@acme.com"}])
+def test_event_without_email_drops_every_profile(cached_profiles, message):
+    invalidate_user_profile(message)
+
+    assert not cached_profiles
+
+
+@pytest.mark.parametrize("message", [None, "ana@acme.com", ["ana@acme.com"]])
+def test_event_that_is_not_an_object_is_ignored(cached_profiles, message):
+    invalidate_user_profile(message)
+
+    assert len(cached_profiles) == 3
+
+
+class FakeConsumer:
+    """Consumer returning one poll of record values, then stopping the
+    listener; a value that is an exception is raised by that poll."""
+
+    def __init__(self, listener, values=()) -> None:
+        self.listener = listener
+        self.values = list(values)
+
+    def topics(self):
+        return {"user.user_profile.updated"}
+
+    def poll(self, timeout_ms):
+        error = next((value for value in self.values
+                      if isinstance(value, Exception)), None)
+        if error is not None:
+            raise error
+
+        self.listener._stopped.set()
+        return {"partition": [SimpleNamespace(value=value)
+                              for value in self.values]}
+
+    def close(self):
+        pass
+
+
+class ImmediateLoop:
+    """Event loop stand-in running the dispatched handlers right away."""
+
+    @staticmethod
+    def call_soon_threadsafe(callback, *args):
+        callback(*args)
+
+
+@pytest.fixture
+def listener(monkeypatch):
+    """Listener whose consumers come from listener.consumers, in order."""
+    messages = []
+    listener = EventListener("profiles", ["user.user_profile.updated",
+                                          "user.user_profile.deleted"],
+                             messages.append)
+    listener.messages = messages
+    listener.consumers = []
+
+    def create_consumer(*topics, **config):
+        consumer = listener.consumers.pop(0)
+        if isinstance(consumer, Exception):
+            raise consumer
+        return consumer
+
+    monkeypatch.setattr(kafka_consumer, "get_kafka_config", lambda: {})
+    monkeypatch.setattr(kafka_consumer, "KafkaConsumer", create_consumer)
+    monkeypatch.setattr(kafka_consumer, "KAFKA_CONSUMER_RETRY_DELAY", 0)
+    return listener
+
+
+def test_listener_warns_about_missing_topics(listener, caplog):
+    listener.consumers = [FakeConsumer(listener)]
+
+    with caplog.at_level(logging.WARNING):
+        listener._run(ImmediateLoop())
+
+    assert "missing topics: user.user_profile.deleted" in caplog.text
+
+
+def test_listener_skips_null_and_invalid_values(listener):
+    listener.consumers = [FakeConsumer(listener, [
+        None, b"not json", b'{"payload": {"email": "ana@acme.com"}}'])]
+
+    listener._run(ImmediateLoop())
+
+    assert listener.messages == [{"payload": {"email": "ana@acme.com"}}]
+
+
+def test_listener_restarts_failed_consumers(listener):
+    listener.consumers = [
+        KafkaConnectionError("no brokers"),
+        FakeConsumer(listener, [KafkaError("connection lost")]),
+        FakeConsumer(listener, [b'{"payload": null}']),
+    ]
+
+    listener._run(ImmediateLoop())
+
+    assert listener.messages == [{"payload": None}]
+    assert not listener.consumers
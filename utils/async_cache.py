@@ -0,0 +1,117 @@
+"""In-process caches of coroutine results."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple, Type
+
+from utils.metrics import metrics
+
+
+class AsyncTTLCache:
+    """LRU cache of coroutine results, with a TTL and single-flight loads.
+
+    Concurrent misses of a key share a single call of the loader. With
+    ``stale_ttl`` an expired value is still served for that long while it is
+    reloaded in the background. Errors listed in ``negative_errors`` are
+    cached for ``negative_ttl`` and raised again on hits. When a load fails
+    with one of ``stale_on_errors``, an expired value is served instead.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            ttl: float,
+            max_size: int = 1024,
+            stale_ttl: float = 0,
+            negative_ttl: float = 0,
+            negative_errors: Tuple[Type[BaseException], ...] = (),
+            stale_on_errors: Tuple[Type[BaseException], ...] = ()
+    ) -> None:
+        """Class initialization."""
+        self.name = name
+        self.ttl = ttl
+        self.max_size = max_size
+        self.stale_ttl = stale_ttl
+        self.negative_ttl = negative_ttl
+        self.negative_errors = negative_errors
+        self.stale_on_errors = stale_on_errors
+        # key -> (expires_at, value, error)
+        self._entries: OrderedDict = OrderedDict()
+        self._loading: Dict[Hashable, asyncio.Future] = {}
+
+    async def get(self, key: Hashable, loader: Callable[[], Awaitable[Any]]):
+        """Cached value of a key, calling loader() when it is missing."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value, error = entry
+            now = time.monotonic()
+
+            if now < expires_at:
+                self._entries.move_to_end(key)
+                metrics.increment("async_cache_hits_total", cache=self.name)
+                if error is not None:
+                    raise error
+                return value
+
+            if error is None and now < expires_at + self.stale_ttl:
+                metrics.increment("async_cache_stale_total", cache=self.name)
+                if key not in self._loading:
+                    self._start_load(key, loader).add_done_callback(
+                        self._log_refresh_error)
+                return value
+
+        metrics.increment("async_cache_misses_total", cache=self.name)
+        future = self._loading.get(key)
+        if future is None:
+            future = self._start_load(key, loader)
+
+        # A cancelled caller does not cancel the load shared with the others
+        try:
+            return await asyncio.shield(future)
+        except self.stale_on_errors:
+            if entry is None or entry[2] is not None:
+                raise
+            metrics.increment("async_cache_stale_on_error_total",
+                              cache=self.name)
+            return entry[1]
+
+    def invalidate(self, key: Hashable) -> None:
+        self._entries.pop(key, None)
+
+    def invalidate_if(self, predicate: Callable[[Hashable], bool]) -> None:
+        """Drop every key matching the predicate."""
+        for key in [key for key in self._entries if predicate(key)]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def _start_load(self, key, loader) -> asyncio.Future:
+        future = asyncio.ensure_future(self._load(key, loader))
+        self._loading[key] = future
+        return future
+
+    async def _load(self, key, loader):
+        try:
+            value = await loader()
+        except self.negative_errors as err:
+            if self.negative_ttl:
+                self._store(key, None, err, self.negative_ttl)
+            raise
+        finally:
+            self._loading.pop(key, None)
+
+        self._store(key, value, None, self.ttl)
+        return value
+
+    def _store(self, key, value, error, ttl) -> None:
+        self._entries[key] = (time.monotonic() + ttl, value, error)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _log_refresh_error(self, future: asyncio.Future) -> None:
+        if not future.cancelled() and future.exception() is not None:
+            logging.error(f"Error refreshing {self.name} cache: "
+                          f"{type(future.exception())} {future.exception()}")
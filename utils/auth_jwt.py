@@ -0,0 +1,46 @@
+"""JWT authentication with memoized token verification."""
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Union
+
+from fastapi_jwt_auth import AuthJWT
+from prettyconf import config
+
+from utils.metrics import metrics
+
+VERIFIED_TOKEN_CACHE_SIZE = config("VERIFIED_TOKEN_CACHE_SIZE", default=4096,
+                                   cast=int)
+
+
+class CachedAuthJWT(AuthJWT):
+    """AuthJWT that verifies a token once per worker.
+
+    The decoded claims are kept by token hash until the token expires, so
+    the signature check and claim parsing of repeated tokens (e.g. the list
+    polls of the UI) are skipped. Tokens without ``exp`` are not kept, and
+    revocation checks still run on every request.
+    """
+
+    _verified_tokens: OrderedDict = OrderedDict()
+
+    def _verified_token(self, encoded_token: str, issuer: Optional[str] = None
+                        ) -> Dict[str, Union[str, int, bool]]:
+        key = (hashlib.sha256(encoded_token.encode("utf-8")).digest(), issuer)
+
+        entry = self._verified_tokens.get(key)
+        if entry is not None and time.time() < entry[0]:
+            self._verified_tokens.move_to_end(key)
+            metrics.increment("jwt_verification_cache_hits_total")
+            return dict(entry[1])
+
+        metrics.increment("jwt_verification_cache_misses_total")
+        raw_token = super()._verified_token(encoded_token, issuer)
+
+        if raw_token.get("exp") is not None:
+            self._verified_tokens[key] = (raw_token["exp"], raw_token)
+            self._verified_tokens.move_to_end(key)
+            while len(self._verified_tokens) > VERIFIED_TOKEN_CACHE_SIZE:
+                self._verified_tokens.popitem(last=False)
+
+        return dict(raw_token)
@@ -0,0 +1,391 @@
+"""Redis backed caches."""
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import logging
+import time
+import zlib
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Union
+
+import aioredis
+from asyncpg import Record
+from prettyconf import config
+from sqlalchemy.engine import Row
+
+from utils.metrics import metrics
+
+REDIS_URL = config("REDIS_URL", default="redis://redis:6379")
+QUERY_CACHE_TTL = config("QUERY_CACHE_TTL", default=86400, cast=int)
+# Time given to late events after the end of a range before it is closed.
+QUERY_CACHE_SETTLE_SECONDS = config("QUERY_CACHE_SETTLE_SECONDS",
+                                    default=3600, cast=int)
+# Format of the cached query results, part of their keys: bump it whenever
+# dumps() or the shape of the results changes, so entries written by a
+# previous deploy are never read back. 2: rows are dicts of their columns.
+QUERY_CACHE_FORMAT = 2
+# Lifetime of the cached list counts; bounds how stale a count can get when
+# records change outside this service.
+COUNT_CACHE_TTL = config("COUNT_CACHE_TTL", default=300, cast=int)
+# Lifetime of the cached filter values; they are added to on create, so this
+# only bounds how long removed values are still offered.
+FACET_CACHE_TTL = config("FACET_CACHE_TTL", default=86400, cast=int)
+# Lifetime of the in-process copies of identical list responses.
+MICRO_CACHE_TTL = config("MICRO_CACHE_TTL", default=2, cast=float)
+# Largest UTC offset of a timezone, used when a date has no timezone.
+MAX_UTC_OFFSET = timedelta(hours=14)
+# Seconds a Redis command or connection may take; a slow Redis is a miss.
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=0.5, cast=float)
+REDIS_CONNECT_TIMEOUT = config("REDIS_CONNECT_TIMEOUT", default=0.5,
+                               cast=float)
+
+# Redis failures the caches treat as a miss instead of an error
+REDIS_ERRORS = (aioredis.RedisError, OSError, asyncio.TimeoutError)
+
+
+class RedisCache:
+    """Shared Redis connection of the application caches."""
+
+    redis: aioredis.Redis = None
+    prefix: str = "report-interface"
+
+    @classmethod
+    async def init(cls, redis: aioredis.Redis,
+                   prefix: str = "report-interface") -> None:
+        cls.redis = redis
+        cls.prefix = prefix
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls.redis is not None:
+            await cls.redis.close()
+            cls.redis = None
+
+    @classmethod
+    def key(cls, *parts) -> str:
+        return ":".join([cls.prefix, *[str(part) for part in parts]])
+
+
+class CountCache:
+    """Cached counts of filtered list queries, grouped by scope.
+
+    The counts of a scope (e.g. a tenant) are kept in a single Redis hash,
+    with one field per set of filters, so invalidate() drops all of them.
+    """
+
+    def __init__(self, name: str, ttl: int = COUNT_CACHE_TTL) -> None:
+        """Class initialization."""
+        self.name = name
+        self.ttl = ttl
+
+    @staticmethod
+    def _field(filters: Union[List[str], None]) -> str:
+        filters = json.dumps(sorted(filters or []), separators=(",", ":"))
+        return hashlib.sha1(filters.encode("utf-8")).hexdigest()
+
+    async def get(self, scope, filters: Union[List[str], None]) -> Union[int, None]:
+        """Cached count of the filters, None when missing."""
+        if RedisCache.redis is None:
+            return None
+
+        key = RedisCache.key("count", self.name, scope)
+        try:
+            count = await RedisCache.redis.hget(key, self._field(filters))
+        except REDIS_ERRORS as err:
+            logging.error(f"Error reading count cache {key}: "
+                          f"{type(err)} {err}")
+            return None
+
+        metrics.increment("count_cache_hits_total" if count is not None
+                          else "count_cache_misses_total", cache=self.name)
+        return int(count) if count is not None else None
+
+    async def set(self, scope, filters: Union[List[str], None], count: int) -> None:
+        if RedisCache.redis is None:
+            return
+
+        key = RedisCache.key("count", self.name, scope)
+        try:
+            async with RedisCache.redis.pipeline(transaction=True) as pipe:
+                await pipe.hset(key, self._field(filters), count) \
+                    .expire(key, self.ttl).execute()
+        except REDIS_ERRORS as err:
+            logging.error(f"Error writing count cache {key}: "
+                          f"{type(err)} {err}")
+
+    async def invalidate(self, scope) -> None:
+        """Drop every cached count of a scope."""
+        if RedisCache.redis is None:
+            return
+
+        key = RedisCache.key("count", self.name, scope)
+        try:
+            await RedisCache.redis.delete(key)
+        except REDIS_ERRORS as err:
+            logging.error(f"Error invalidating count cache {key}: "
+                          f"{type(err)} {err}")
+
+
+class FacetCache:
+    """Cached distinct values of list filter fields, grouped by scope.
+
+    Each field of a scope is a Redis set of JSON encoded values, next to a
+    marker key telling the sets are loaded. add() only updates loaded scopes,
+    so a half filled set is never read.
+
+    add() also bumps a generation counter of the scope, loaded or not. A
+    loader reads generation() before the values and set() writes them only
+    if the generation did not change, so values added while the scope was
+    being loaded are never overwritten by an older read.
+    """
+
+    def __init__(self, name: str, ttl: int = FACET_CACHE_TTL) -> None:
+        """Class initialization."""
+        self.name = name
+        self.ttl = ttl
+
+    def _keys(self, scope, fields) -> tuple:
+        marker = RedisCache.key("facet", self.name, scope)
+        return marker, {field: f"{marker}:{field}" for field in fields}
+
+    def _generation_key(self, scope) -> str:
+        return RedisCache.key("facet-generation", self.name, scope)
+
+    async def get(self, scope, fields: List[str]) -> Union[Dict[str, list], None]:
+        """Values of each field, None when the scope is not loaded."""
+        if RedisCache.redis is None:
+            return None
+
+        marker, keys = self._keys(scope, fields)
+        try:
+            async with RedisCache.redis.pipeline(transaction=False) as pipe:
+                pipe.exists(marker)
+                for key in keys.values():
+                    pipe.smembers(key)
+                loaded, *members = await pipe.execute()
+        except REDIS_ERRORS as err:
+            logging.error(f"Error reading facet cache {marker}: "
+                          f"{type(err)} {err}")
+            return None
+
+        metrics.increment("facet_cache_hits_total" if loaded
+                          else "facet_cache_misses_total", cache=self.name)
+        if not loaded:
+            return None
+
+        return {field: sorted((json.loads(value) for value in values),
+                              key=lambda value: (value is None, str(value)))
+                for field, values in zip(keys, members)}
+
+    async def generation(self, scope) -> Union[bytes, None]:
+        """Generation of a scope, to read before loading its values."""
+        if RedisCache.redis is None:
+            return None
+
+        key = self._generation_key(scope)
+        try:
+            return await RedisCache.redis.get(key)
+        except REDIS_ERRORS as err:
+            logging.error(f"Error reading facet cache {key}: "
+                          f"{type(err)} {err}")
+            return None
+
+    async def set(self, scope, facets: Dict[str, list],
+                  generation: Union[bytes, None]) -> None:
+        """Replace the values of every field of a scope, unless values were
+        added since ``generation`` was read."""
+        if RedisCache.redis is None:
+            return
+
+        marker, keys = self._keys(scope, facets)
+        generation_key = self._generation_key(scope)
+        try:
+            async with RedisCache.redis.pipeline(transaction=True) as pipe:
+                await pipe.watch(generation_key)
+                if await pipe.get(generation_key) != generation:
+                    raise aioredis.WatchError("Facet values were added")
+
+                pipe.multi()
+                pipe.delete(*keys.values())
+                for field, values in facets.items():
+                    if values:
+                        pipe.sadd(keys[field], *[json.dumps(value) for value in values])
+                        pipe.expire(keys[field], self.ttl)
+                pipe.set(marker, 1, ex=self.ttl)
+                await pipe.execute()
+        except aioredis.WatchError:
+            # The next miss loads the scope again
+            metrics.increment("facet_cache_conflicts_total", cache=self.name)
+        except REDIS_ERRORS as err:
+            logging.error(f"Error writing facet cache {marker}: "
+                          f"{type(err)} {err}")
+
+    async def add(self, scope, values: dict) -> None:
+        """Add one value per field to a loaded scope."""
+        if RedisCache.redis is None:
+            return
+
+        marker, keys = self._keys(scope, values)
+        generation_key = self._generation_key(scope)
+        try:
+            # The generation is bumped before the marker is checked, so a
+            # concurrent set() either sees it or is done before the check.
+            async with RedisCache.redis.pipeline(transaction=True) as pipe:
+                _, _, loaded = await pipe.incr(generation_key) \
+                    .expire(generation_key, self.ttl).exists(marker).execute()
+            if not loaded:
+                return
+
+            async with RedisCache.redis.pipeline(transaction=True) as pipe:
+                for field, value in values.items():
+                    pipe.sadd(keys[field], json.dumps(value))
+                    pipe.expire(keys[field], self.ttl)
+                await pipe.execute()
+        except REDIS_ERRORS as err:
+            logging.error(f"Error writing facet cache {marker}: "
+                          f"{type(err)} {err}")
+
+
+class MicroCache:
+    """In-process cache of short lived values, absorbing request bursts."""
+
+    def __init__(self, ttl: float = MICRO_CACHE_TTL, max_size: int = 1024) -> None:
+        """Class initialization."""
+        self.ttl = ttl
+        self.max_size = max_size
+        self._values = OrderedDict()
+
+    def get(self, key):
+        entry = self._values.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+        return entry[1]
+
+    def set(self, key, value) -> None:
+        self._values[key] = (time.monotonic() + self.ttl, value)
+        self._values.move_to_end(key)
+        while len(self._values) > self.max_size:
+            self._values.popitem(last=False)
+
+
+def _to_plain(value):
+    """Convert query results into plain lists and dicts; rows become dicts
+    of their columns."""
+    if isinstance(value, Row):
+        return {key: _to_plain(item) for key, item in value._mapping.items()}
+    if isinstance(value, dict):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, Record):
+        return {key: _to_plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_plain(item) for item in value]
+    return value
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, date):
+        return {"__date__": value.isoformat()}
+    if isinstance(value, Decimal):
+        return {"__decimal__": str(value)}
+    raise TypeError(f"Object of type {type(value)} is not serializable")
+
+
+def _decode(value: dict):
+    if "__datetime__" in value:
+        return datetime.fromisoformat(value["__datetime__"])
+    if "__date__" in value:
+        return date.fromisoformat(value["__date__"])
+    if "__decimal__" in value:
+        return Decimal(value["__decimal__"])
+    return value
+
+
+def dumps(value) -> bytes:
+    """Serialize query results as compressed, compact JSON."""
+    return zlib.compress(json.dumps(_to_plain(value), default=_encode,
+                                    separators=(",", ":")).encode("utf-8"))
+
+
+def loads(data: bytes):
+    """Deserialize query results written by dumps()."""
+    return json.loads(zlib.decompress(data).decode("utf-8"),
+                      object_hook=_decode)
+
+
+def is_closed_range(end_date: datetime) -> bool:
+    """Whether a date range ends fully in the past, so its results are final."""
+    settle = timedelta(seconds=QUERY_CACHE_SETTLE_SECONDS)
+
+    if end_date.tzinfo is not None:
+        return end_date + settle < datetime.now(end_date.tzinfo)
+
+    return end_date + settle + MAX_UTC_OFFSET < datetime.utcnow()
+
+
+def _normalize(value) -> str:
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None, microsecond=0).isoformat()
+    return str(value)
+
+
+def cached_query(name: str, version: int = 1):
+    """Cache the results of a report query for closed date ranges.
+
+    The decorated coroutine must take ``start_date``, ``end_date`` and
+    ``tenant_id``; every other argument except ``db`` is part of the key.
+    Ranges that reach the present, or a missing Redis, bypass the cache.
+    Bump ``version`` whenever the results of the query change shape.
+
+    Results always come back as plain data, cached or not: rows become dicts
+    of their columns, sequences lists.
+    """
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            arguments = signature.bind(*args, **kwargs).arguments
+            redis = RedisCache.redis
+
+            if redis is None or not is_closed_range(arguments["end_date"]):
+                metrics.increment("query_cache_bypass_total", query=name)
+                return _to_plain(await func(*args, **kwargs))
+
+            key = RedisCache.key(
+                "query", f"v{QUERY_CACHE_FORMAT}", name, f"v{version}",
+                arguments["tenant_id"],
+                *[_normalize(value) for argument, value in arguments.items()
+                  if argument not in ("tenant_id", "db")])
+
+            try:
+                cached = await redis.get(key)
+            except REDIS_ERRORS as err:
+                logging.error(f"Error reading query cache {key}: "
+                              f"{type(err)} {err}")
+                cached = None
+
+            if cached is not None:
+                metrics.increment("query_cache_hits_total", query=name)
+                return loads(cached)
+
+            metrics.increment("query_cache_misses_total", query=name)
+            result = _to_plain(await func(*args, **kwargs))
+
+            try:
+                await redis.set(key, dumps(result), ex=QUERY_CACHE_TTL)
+            except REDIS_ERRORS as err:
+                logging.error(f"Error writing query cache {key}: "
+                              f"{type(err)} {err}")
+
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,172 @@
+"""Circuit breaker and hedged requests for the upstream services."""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Union
+
+from fastapi import HTTPException
+
+from utils.metrics import metrics
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """Call rejected because the circuit of the upstream is open."""
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """Whether an error is the upstream fault; 4xx answers are not."""
+    if isinstance(error, HTTPException):
+        return error.status_code >= 500
+    return True
+
+
+class CircuitBreaker:
+    """Circuit breaker of an upstream, on its error rate and latency.
+
+    The outcome of the last ``window`` calls is kept; calls that fail or take
+    longer than ``slow_call_seconds`` are bad. Once ``min_calls`` were made and
+    the rate of bad calls reaches ``failure_rate``, the circuit opens and
+    calls fail fast for ``reset_timeout`` seconds; then a single probe call
+    decides whether it closes or opens again.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            failure_rate: float = 0.5,
+            slow_call_seconds: float = 2.0,
+            window: int = 20,
+            min_calls: int = 10,
+            reset_timeout: float = 30,
+            is_failure: Callable[[BaseException], bool] = is_upstream_failure
+    ) -> None:
+        """Class initialization."""
+        self.name = name
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self.is_failure = is_failure
+        self.state = CLOSED
+        self._opened_at = 0.0
+        self._opened_count = 0
+        self._probing = False
+        self._calls = deque(maxlen=window)
+        self._latencies = deque(maxlen=100)
+
+        metrics.register_gauge("circuit_breaker_state",
+                               lambda: _STATE_VALUES[self.state],
+                               upstream=name)
+
+    def latency_quantile(self, quantile: float) -> Union[float, None]:
+        """Latency quantile of the recent successful calls."""
+        if len(self._latencies) < self.min_calls:
+            return None
+        latencies = sorted(self._latencies)
+        return latencies[min(int(len(latencies) * quantile), len(latencies) - 1)]
+
+    async def call(self, factory: Callable[[], Awaitable[Any]],
+                   hedge: bool = False):
+        """Run factory() through the breaker, hedged after the p95 latency
+        when ``hedge`` is set. Raises CircuitOpenError while open."""
+        if self.state == OPEN:
+            if time.monotonic() < self._opened_at + self.reset_timeout:
+                metrics.increment("circuit_breaker_rejected_total",
+                                  upstream=self.name)
+                raise CircuitOpenError(f"Circuit of {self.name} is open")
+            self.state = HALF_OPEN
+
+        is_probe = False
+        if self.state == HALF_OPEN:
+            if self._probing:
+                metrics.increment("circuit_breaker_rejected_total",
+                                  upstream=self.name)
+                raise CircuitOpenError(f"Circuit of {self.name} is half open")
+            self._probing = is_probe = True
+
+        opened = self._opened_count
+        delay = self.latency_quantile(0.95) if hedge else None
+        started = time.monotonic()
+        try:
+            if delay is None:
+                result = await factory()
+            else:
+                result = await hedged(factory, delay, self.name)
+
+        except Exception as err:
+            self._record(time.monotonic() - started, self.is_failure(err),
+                         is_probe, opened)
+            raise
+
+        finally:
+            if is_probe:
+                self._probing = False
+
+        self._record(time.monotonic() - started, False, is_probe, opened)
+        return result
+
+    def _record(self, elapsed: float, failed: bool, is_probe: bool,
+                opened: int) -> None:
+        # Calls started before the circuit last opened say nothing about it
+        if opened != self._opened_count:
+            return
+
+        if not failed:
+            self._latencies.append(elapsed)
+        bad = failed or elapsed > self.slow_call_seconds
+
+        if is_probe:
+            if bad:
+                self._open()
+            else:
+                self.state = CLOSED
+                self._calls.clear()
+            return
+
+        if self.state != CLOSED:
+            return
+
+        self._calls.append(bad)
+        if len(self._calls) >= self.min_calls and \
+                sum(self._calls) / len(self._calls) >= self.failure_rate:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._opened_count += 1
+        self._calls.clear()
+        metrics.increment("circuit_breaker_opened_total", upstream=self.name)
+
+
+async def hedged(factory: Callable[[], Awaitable[Any]], delay: float,
+                 name: str = ""):
+    """Run factory(), starting a second attempt if the first one has not
+    finished after ``delay`` seconds; the first success wins."""
+    tasks = {asyncio.ensure_future(factory())}
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return done.pop().result()
+
+        metrics.increment("hedged_requests_total", upstream=name)
+        tasks.add(asyncio.ensure_future(factory()))
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error
+
+    finally:
+        for task in tasks:
+            task.cancel()
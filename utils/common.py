@@ -1,17 +1,23 @@
 """Common function for all system."""
+import asyncio
 import json
 import logging
 import secrets
 import string
-from typing import List
+from typing import List, Optional
 
 from aiohttp import ClientSession
 from fastapi import HTTPException, Request, Query
+from prettyconf import config
 from sqlalchemy.exc import SQLAlchemyError
 
-from db.postgres import SessionLocal as postgres_async
+from db.postgres import SessionLocal as postgres_async, \
+    ReportingSessionLocal as postgres_reporting_async
 from utils.datetime_encoder import DateTimeEncoder
 
+# Deadline (seconds) shared by the upstream calls of a request
+UPSTREAM_TIMEOUT = config("UPSTREAM_TIMEOUT", default=10, cast=float)
+
 
 def secret_key_generator():
     """ If there is no reference to an environment variable named SECRET KEY,
@@ -28,6 +34,12 @@ async def get_db_postgres():
         yield session
 
 
+async def get_db_postgres_reporting():
+    """Dependency function that yields db sessions from the reporting pool."""
+    async with postgres_reporting_async() as session:
+        yield session
+
+
 def http_exception(message, status, headers=None):
     """
     :param message: {"name_error" : True or False}
@@ -54,6 +66,31 @@ async def database_commit(session, model) -> None:
         raise err
 
 
+async def gather_with_deadline(*aws, timeout: float = UPSTREAM_TIMEOUT) -> list:
+    """Run awaitables concurrently under a shared deadline.
+
+    The first failure cancels the siblings still running and is raised; when
+    the deadline passes first, asyncio.TimeoutError is raised instead.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        done, pending = await asyncio.wait(
+            tasks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+
+        errors = [task.exception() for task in done
+                  if not task.cancelled() and task.exception() is not None]
+        if errors:
+            raise errors[0]
+        if pending:
+            raise asyncio.TimeoutError()
+
+        return [task.result() for task in tasks]
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
 def data_to_open_search(data_open):
     # tratamento separado de sql/json
     data = {
@@ -86,17 +123,29 @@ Multiple values in the same field are joined as `or` conditions."""
 SORTS_DESC = """The sort will accept parameters like `col:ASC` or `col:DESC` 
 and will split on the `:` char. 
 If it does not find a `:` it will sort ascending on that column."""
+CURSOR_DESC = """Enables cursor pagination, which keeps deep pages fast. 
+Send it empty to get the first page, then send the `next_cursor` of the 
+previous response. When present, `page` is ignored."""
+COUNT_MODE_DESC = """How `count` and `number_pages` are computed: `exact` 
+counts the records, `estimated` uses the planner estimate when there are no 
+filters, `cached` reuses a recent count and `none` skips them. 
+`count_exact` tells whether the returned count is exact."""
 
 
 async def common_filter_parameters(
         page: int = Query(1, title="Page", description="The requested page"),  # NOQA
         page_size: int = Query(100, title="Page size", description=PAGE_SIZE_DESC),  # NOQA
         filters: List[str] = Query(list(), title="Filter fields", description=FILTERS_DESC),  # NOQA
-        sorts: List[str] = Query(list(), title="Sort fields", description=SORTS_DESC)  # NOQA
+        sorts: List[str] = Query(list(), title="Sort fields", description=SORTS_DESC),  # NOQA
+        cursor: Optional[str] = Query(None, title="Cursor", description=CURSOR_DESC),  # NOQA
+        count_mode: str = Query("exact", title="Count mode", description=COUNT_MODE_DESC,  # NOQA
+                                regex="^(exact|estimated|cached|none)$")
 ) -> dict:
     return {
         "page": page,
         "page_size": page_size,
         "filters": filters,
-        "sorts": sorts
+        "sorts": sorts,
+        "cursor": cursor,
+        "count_mode": count_mode
     }
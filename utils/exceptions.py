@@ -1,5 +1,6 @@
 """Exceptions implementation."""
 
+from fastapi import HTTPException
 from fastapi_jwt_auth.exceptions import AuthJWTException
 
 
@@ -10,3 +11,11 @@ class AuthException(AuthJWTException):
         """Start variables."""
         self.status_code = status_code
         self.message = message
+
+
+class NotFoundException(HTTPException):
+    """Upstream resource not found, cacheable as a negative result."""
+
+    def __init__(self, message: str):
+        """Start variables."""
+        super().__init__(status_code=404, detail=message)
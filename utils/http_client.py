@@ -0,0 +1,149 @@
+"""Shared HTTP client for the upstream services."""
+import asyncio
+import random
+from typing import Dict, Union
+from urllib.parse import urlsplit
+
+from aiohttp import ClientConnectionError, ClientResponseError, \
+    ClientSession, ClientTimeout, TCPConnector, TraceConfig
+from prettyconf import config
+
+import settings
+from utils.metrics import metrics
+from utils.requests.middleware import CORRELATION_ID_HEADER_KEY, \
+    correlation_id_context
+
+HTTP_CLIENT_POOL_SIZE = config("HTTP_CLIENT_POOL_SIZE", default=100, cast=int)
+HTTP_CLIENT_POOL_SIZE_PER_HOST = config("HTTP_CLIENT_POOL_SIZE_PER_HOST",
+                                        default=30, cast=int)
+HTTP_CLIENT_KEEPALIVE = config("HTTP_CLIENT_KEEPALIVE", default=30, cast=float)
+HTTP_CLIENT_DNS_CACHE_TTL = config("HTTP_CLIENT_DNS_CACHE_TTL", default=300,
+                                   cast=int)
+HTTP_CLIENT_CONNECT_TIMEOUT = config("HTTP_CLIENT_CONNECT_TIMEOUT", default=3,
+                                     cast=float)
+HTTP_CLIENT_TIMEOUT = config("HTTP_CLIENT_TIMEOUT", default=30, cast=float)
+# Total timeout of a single user_interface request (each retry gets its own)
+USER_INTERFACE_TIMEOUT = config("USER_INTERFACE_TIMEOUT", default=5,
+                                cast=float)
+# Attempts of an idempotent GET, and the base of its exponential backoff
+HTTP_CLIENT_GET_ATTEMPTS = config("HTTP_CLIENT_GET_ATTEMPTS", default=3,
+                                  cast=int)
+HTTP_CLIENT_RETRY_BACKOFF = config("HTTP_CLIENT_RETRY_BACKOFF", default=0.1,
+                                   cast=float)
+
+
+class CustomClientSession(ClientSession):
+    """Custom ClientSession with integrated CorrelationID control.
+
+    Requests take the timeout of their upstream host when no timeout is
+    given, and GETs that fail on the connection or get a 5xx are retried with
+    jittered exponential backoff. Timeouts are not retried, so a slow
+    upstream costs one timeout only.
+    """
+
+    def __init__(self, *args,
+                 upstream_timeouts: Union[Dict[str, ClientTimeout], None] = None,
+                 **kwargs) -> None:
+        """Class initialization."""
+        super().__init__(*args, **kwargs)
+        self.upstream_timeouts = upstream_timeouts or {}
+
+    async def _request(self, method, url, **kwargs):
+        headers = kwargs.get("headers", {})
+        if CORRELATION_ID_HEADER_KEY not in headers:
+            correlation_id = correlation_id_context.get()
+            headers.update({CORRELATION_ID_HEADER_KEY: correlation_id})
+            kwargs.update({"headers": headers})
+
+        host = urlsplit(str(url)).hostname
+        if "timeout" not in kwargs and host in self.upstream_timeouts:
+            kwargs["timeout"] = self.upstream_timeouts[host]
+
+        attempts = HTTP_CLIENT_GET_ATTEMPTS if method.upper() == "GET" else 1
+        for attempt in range(1, attempts + 1):
+            try:
+                return await super()._request(method, url, **kwargs)
+
+            except (ClientConnectionError, ClientResponseError) as e:
+                # ServerTimeoutError is a ClientConnectionError too
+                if attempt == attempts or isinstance(e, asyncio.TimeoutError) or (
+                        isinstance(e, ClientResponseError) and e.status < 500):
+                    raise
+
+            metrics.increment("http_client_retries_total", host=host)
+            await asyncio.sleep(random.uniform(
+                0, HTTP_CLIENT_RETRY_BACKOFF * 2 ** (attempt - 1)))
+
+
+def _trace_config() -> TraceConfig:
+    """Connection reuse, request duration and requests in flight metrics."""
+    in_flight = {"requests": 0}
+
+    def track_in_flight(change: int) -> None:
+        in_flight["requests"] += change
+        metrics.set_gauge("http_client_requests_in_flight",
+                          in_flight["requests"])
+
+    async def on_request_start(session, context, params):
+        context.started = asyncio.get_running_loop().time()
+        track_in_flight(1)
+
+    async def on_request_end(session, context, params):
+        track_in_flight(-1)
+        metrics.observe("http_client_request_seconds",
+                        asyncio.get_running_loop().time() - context.started,
+                        host=params.url.host, status=params.response.status)
+
+    async def on_request_exception(session, context, params):
+        track_in_flight(-1)
+        metrics.increment("http_client_errors_total", host=params.url.host,
+                          error=type(params.exception).__name__)
+
+    async def on_connection_create_end(session, context, params):
+        metrics.increment("http_client_connections_created_total")
+
+    async def on_connection_reuseconn(session, context, params):
+        metrics.increment("http_client_connections_reused_total")
+
+    async def on_dns_cache_hit(session, context, params):
+        metrics.increment("http_client_dns_cache_hits_total", host=params.host)
+
+    async def on_dns_cache_miss(session, context, params):
+        metrics.increment("http_client_dns_cache_misses_total",
+                          host=params.host)
+
+    trace_config = TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    trace_config.on_connection_create_end.append(on_connection_create_end)
+    trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+    trace_config.on_dns_cache_hit.append(on_dns_cache_hit)
+    trace_config.on_dns_cache_miss.append(on_dns_cache_miss)
+    return trace_config
+
+
+def create_client_session() -> CustomClientSession:
+    """Create the HTTP client shared by the application."""
+    connector = TCPConnector(
+        limit=HTTP_CLIENT_POOL_SIZE,
+        limit_per_host=HTTP_CLIENT_POOL_SIZE_PER_HOST,
+        keepalive_timeout=HTTP_CLIENT_KEEPALIVE,
+        use_dns_cache=True,
+        ttl_dns_cache=HTTP_CLIENT_DNS_CACHE_TTL
+    )
+
+    session = CustomClientSession(
+        connector=connector,
+        raise_for_status=True,
+        timeout=ClientTimeout(total=HTTP_CLIENT_TIMEOUT,
+                              connect=HTTP_CLIENT_CONNECT_TIMEOUT),
+        upstream_timeouts={
+            urlsplit(settings.USER_INTERFACE_URL).hostname: ClientTimeout(
+                total=USER_INTERFACE_TIMEOUT,
+                connect=HTTP_CLIENT_CONNECT_TIMEOUT)
+        },
+        trace_configs=[_trace_config()]
+    )
+
+    return session
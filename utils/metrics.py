@@ -0,0 +1,85 @@
+"""In-process metrics registry."""
+import threading
+from collections import defaultdict
+from typing import Callable, Dict, Tuple
+
+
+class MetricsRegistry:
+    """Thread-safe registry of counters, gauges and timings.
+
+    Every metric is identified by its name plus an optional set of labels,
+    e.g. ``metrics.increment("db_pool_overflow_total", pool="api")``.
+    """
+
+    def __init__(self) -> None:
+        """Class initialization."""
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple, float] = defaultdict(float)
+        self._gauges: Dict[Tuple, float] = {}
+        self._gauge_callbacks: Dict[Tuple, Callable[[], float]] = {}
+        self._timings: Dict[Tuple, dict] = {}
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> Tuple:
+        return name, tuple(sorted(labels.items()))
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[self._key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels) -> None:
+        """Set the current value of a gauge."""
+        with self._lock:
+            self._gauges[self._key(name, labels)] = value
+
+    def register_gauge(self, name: str, callback: Callable[[], float],
+                       **labels) -> None:
+        """Register a gauge whose value is read when a snapshot is taken."""
+        with self._lock:
+            self._gauge_callbacks[self._key(name, labels)] = callback
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record a duration, in seconds."""
+        with self._lock:
+            timing = self._timings.setdefault(
+                self._key(name, labels), {"count": 0, "total": 0.0, "max": 0.0})
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+
+    def snapshot(self) -> dict:
+        """Return the current value of every registered metric."""
+        with self._lock:
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            callbacks = dict(self._gauge_callbacks)
+            timings = {key: dict(value) for key, value in self._timings.items()}
+
+        for key, callback in callbacks.items():
+            gauges[key] = callback()
+
+        return {
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in counters.items()
+            ],
+            "gauges": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in gauges.items()
+            ],
+            "timings": [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": timing["count"],
+                    "total": timing["total"],
+                    "max": timing["max"],
+                    "avg": timing["total"] / timing["count"]
+                }
+                for (name, labels), timing in timings.items()
+            ]
+        }
+
+
+metrics = MetricsRegistry()
@@ -6,6 +6,13 @@ response_reports = {
 
     "register": {
         422: {"description": "api073"},
+        504: {"description": "Upstream services timed out"},
+        200: {"description": "api072"}
+    },
+
+    "bulk_register": {
+        422: {"description": "api073"},
+        504: {"description": "Upstream services timed out"},
         200: {"description": "api072"}
     },
 }
\ No newline at end of file
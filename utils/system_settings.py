@@ -5,7 +5,7 @@ import re
 from typing import Any, Callable, Dict
 
 import asyncio
-from aiohttp import ClientSession
+import aioredis
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
 from fastapi.openapi.utils import get_openapi
@@ -13,12 +13,17 @@ from fastapi.responses import JSONResponse
 from fastapi.routing import APIRoute
 from fastapi_jwt_auth import AuthJWT
 from fastapi_jwt_auth.exceptions import AuthJWTException
+from db.health import health_checker
+from domain.get_user_profiles import user_profile_events
+from domain.kafka_producer import EventProducer
+from domain.outbox_relay import outbox_relay
+from utils.cache import REDIS_CONNECT_TIMEOUT, REDIS_SOCKET_TIMEOUT, \
+    REDIS_URL, RedisCache
 from utils.exceptions import AuthException
+from utils.http_client import create_client_session
 from schemas.jwt_auth import AuthJwtSettings
 import logger
 
-from utils.requests.middleware import CORRELATION_ID_HEADER_KEY, correlation_id_context
-
 
 @AuthJWT.load_config
 def get_config():
@@ -68,25 +73,38 @@ def customization_setup(app: FastAPI) -> None:
         """Creation of access limit to routes."""
         print("STARTUP APP")
 
-        class CustomClientSession(ClientSession):
-            """Custom ClientSession with integrated CorrelationID control."""
+        setattr(app.state, "client_session", create_client_session())
+
+        # Background validation of idle database connections
+        health_checker.start()
+
+        # Redis for the query result cache
+        await RedisCache.init(aioredis.from_url(
+            REDIS_URL, socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT))
 
-            async def _request(self, method, url, **kwargs):
-                headers = kwargs.get("headers", {})
-                if CORRELATION_ID_HEADER_KEY not in headers:
-                    correlation_id = correlation_id_context.get()
-                    headers.update({CORRELATION_ID_HEADER_KEY: correlation_id})
-                    kwargs.update({"headers": headers})
-                return await super()._request(method, url, **kwargs)
+        # Invalidation of the cached user profiles
+        user_profile_events.start()
 
-        setattr(app.state, "client_session",
-                CustomClientSession(raise_for_status=True))
+        # Shared Kafka producer; connecting to the brokers blocks
+        await asyncio.get_running_loop().run_in_executor(
+            None, EventProducer.start)
+
+        # Publication of the events written to the outbox
+        outbox_relay.start()
 
         # Logging configuration
         logger.config_log()
 
     @app.on_event("shutdown")
     async def shutdown():
+        await health_checker.stop()
+        await RedisCache.close()
+        await user_profile_events.stop()
+        await outbox_relay.stop()
+        await asyncio.get_running_loop().run_in_executor(
+            None, EventProducer.stop)
+
         # Async Client Session Close
         await asyncio.wait((app.state.client_session.close()), timeout=5.0)
 